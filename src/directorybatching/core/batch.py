@@ -2,6 +2,8 @@
 import directorybatching.core.directory as directory
 
 from directorybatching.core.parallel import simple as eparallel
+from directorybatching.core.parallel import stream as estream
+from directorybatching.core.parallel import Executor
 import directorybatching.core.table as table
 import directorybatching.core.job as job
 import directorybatching.core.status as status
@@ -16,6 +18,7 @@ import numpy as np
 import logging
 from types import SimpleNamespace
 import multiprocessing
+import queue
 
 class Batch(ABC):
 
@@ -45,6 +48,10 @@ class Batch(ABC):
     # Addtional command line inputs
     def parse_cmd_args(self, parser): return parser
 
+    # Addtional command line inputs of model classes, e.g., FunwaveBatch, 
+    # kept separate so parse_cmd_args is left for the user
+    def _parse_model_cmd_args(self, parser): return parser
+
     # Defines mapping between table columns and internal parameters  
     # Returns a list of namedtuples 
     def construct_table_maps(self): return None
@@ -55,6 +62,10 @@ class Batch(ABC):
 
     def get_job_type(self): return None
 
+    # Additional data passed to each job, e.g., scheduler output files, 
+    # computed once for all jobs from list of (leaf_id, dpath, params)
+    def _prep_job_contexts(self, list_args): return [None]*len(list_args)
+
 
     ####################
     # Property Members #
@@ -74,37 +85,49 @@ class Batch(ABC):
     #    Public methods    #
     ########################
 
-    def _update_jobs(self, jobs, results, name):
-
-        logger = self.logger
+    def _sync_jobs(self, jobs, results, is_flag=False):
 
         for j, r in zip(jobs, results):
             j._params.update(r.job_params)
             j._files.update(r.job_files)
 
         self._table.update_from_jobs(jobs, results)
-        jobs = [j for j, r in zip(jobs, results) if r.is_continue]
 
-        self._dstruc.save_to_file()
-        all_errors = [r.status for r in results if not r.status.is_valid]
+        # Note: Flagged after results are synced so continue mode can restore them 
+        if is_flag:
+            for j, r in zip(jobs, results):
+                if r.status.is_valid: j.mk_flag_file()
+
+        return [j for j, r in zip(jobs, results) if r.is_continue]
+
+    def _log_stage(self, statuses, n_continue, name):
+
+        logger = self.logger
+
+        all_errors = [s for s in statuses if not s.is_valid]
 
         errors = []
         for e in all_errors:
             if not e in errors: errors.append(e)
 
-        n = len(results)
+        n = len(statuses)
         for e in errors:
-            ne = np.sum(all_errors==e)
+            ne = np.sum([a==e for a in all_errors])
             if ne == 0: continue
             
             p = 100*ne/n
             logger.warning("%d/%d [%.1f%%] jobs failed %s with status '%s'." % (ne, n, p, name, e.display_string)) 
 
         is_no_error = len(errors) == 0
-        is_no_jobs = len(jobs) == 0
+        is_no_jobs = n_continue == 0
 
+        # Note: In continue mode completed jobs are skipped, remaining jobs all 
+        #       failing is expected when resuming a finished batch
         if is_no_jobs and not is_no_error:
-            logger.error("No jobs passed %s" % name)
+            if self._is_continue:
+                logger.warning("No remaining jobs passed %s." % name)
+            else:
+                logger.error("No jobs passed %s" % name)
 
         self._is_no_jobs = is_no_jobs 
         if is_no_jobs:
@@ -113,32 +136,199 @@ class Batch(ABC):
         if is_no_error:
             logger.info("All jobs passed %s" % name)
         else:
-            nj = len(jobs)
-            p = 100*nj/n
-            logger.warning("%d/%d [%.1f%%] jobs passed %s" % (nj, nj, p, name))
+            p = 100*n_continue/n
+            logger.warning("%d/%d [%.1f%%] jobs passed %s" % (n_continue, n, p, name))
+
+    def _save_structure(self):
+        # Rolling up statuses of leafs changed by stage before saving
+        self._dstruc._update_status()
+        self._dstruc.save_to_file()
+
+    def _update_jobs(self, jobs, results, name, is_flag=False):
+
+        jobs = self._sync_jobs(jobs, results, is_flag)
+        self._save_structure()
+        self._log_stage([r.status for r in results], len(jobs), name)
 
         return jobs
 
+    def _collect_jobs(self, jobs, results, name, is_flag=False):
+
+        # Results are synced to table in blocks as they complete, only 
+        # statuses are kept for logging summary at end of stage
+        statuses = []
+        next_jobs = []
+        block_jobs, block_results = [], []
+
+        def sync_block():
+            next_jobs.extend(self._sync_jobs(block_jobs, block_results, is_flag))
+            block_jobs.clear()
+            block_results.clear()
+
+        for i, r in results:
+            block_jobs.append(jobs[i])
+            block_results.append(r)
+            statuses.append(r.status)
+            if len(block_results) >= self._args.update_size: sync_block()
+
+        if len(block_results) > 0: sync_block()
+
+        self._save_structure()
+        self._log_stage(statuses, len(next_jobs), name)
+
+        return next_jobs
+
+    def _run_jobs(self, jobs, meth_name, p_desc, name, callback=None):
+
+        args = self._args
+        # Completed jobs are flagged to be skipped in continue mode 
+        is_flag = meth_name == 'execute'
+
+        # Note: Workers forward job logs to the shared log writer 
+        initializer, initargs = self._mlogs.worker_init()
+
+        if args.executor == 'simple':
+            func_list = [getattr(j, meth_name) for j in jobs]
+            results = eparallel(func_list, args.num_procs, p_desc, callback=callback, 
+                                initializer=initializer, initargs=initargs)
+            return self._update_jobs(jobs, results, name, is_flag)
+
+        if args.executor == 'stream':
+            func_list = [getattr(j, meth_name) for j in jobs]
+            results = estream(func_list, args.num_procs, p_desc, callback=callback, 
+                              chunksize=args.chunksize, max_inflight=args.max_inflight,
+                              initializer=initializer, initargs=initargs)
+        else:
+            # Jobs are resident in pool workers, only syncing parameters/files 
+            # added by previous stages as workers hold their initial copy 
+            tasks = [(j._leaf_id, meth_name, {'_params': j._params, '_files': j._files}) for j in jobs]
+            results = self._executor.stream(tasks, len(tasks), p_desc, callback=callback)
+
+        return self._collect_jobs(jobs, results, name, is_flag)
+
+    def _run_pipeline(self, jobs, callback=None):
+
+        args = self._args
+
+        stages = {'validate': SimpleNamespace(name='validation', is_flag=False, jobs=[], results=[], statuses=[], next_jobs=[]),
+                  'execute' : SimpleNamespace(name=self._name , is_flag=True , jobs=[], results=[], statuses=[], next_jobs=[])}
+
+        def sync_block(stage):
+            stage.next_jobs.extend(self._sync_jobs(stage.jobs, stage.results, stage.is_flag))
+            stage.jobs.clear()
+            stage.results.clear()
+
+        # Note: FIFO queue so i-th task read by pool is i-th task added
+        tasks = queue.Queue()
+        queued = []
+
+        def add_task(j, meth_name, params={}, files={}):
+            # Copying as parent job may be updated while task is waiting to be sent 
+            updates = {'_params': {**j._params, **params}, '_files': {**j._files, **files}}
+            queued.append((j, meth_name))
+            tasks.put((j._leaf_id, meth_name, updates))
+
+        def read_tasks():
+            while True:
+                task = tasks.get()
+                if task is None: return
+                yield task
+
+        for j in jobs: add_task(j, 'validate')
+        n_pending = len(jobs)
+        if n_pending == 0: tasks.put(None)
+
+        results = self._executor.stream(read_tasks(), p_desc='Pipeline', callback=callback)
+
+        try:
+            for i, r in results:
+
+                j, meth_name = queued[i]
+                stage = stages[meth_name]
+                stage.jobs.append(j)
+                stage.results.append(r)
+                stage.statuses.append(r.status)
+
+                # Executing job as soon as it is individually validated 
+                if meth_name == 'validate' and r.is_continue:
+                    add_task(j, 'execute', r.job_params, r.job_files)
+                    n_pending += 1
+
+                n_pending -= 1
+                if n_pending == 0: tasks.put(None)
+
+                if len(stage.results) < args.update_size: continue
+
+                # Note: Validation results of executed jobs are synced first, otherwise a  
+                #       later validation block overwrites the statuses of executed jobs
+                validate = stages['validate']
+                if meth_name == 'execute' and len(validate.results) > 0: sync_block(validate)
+                sync_block(stage)
+        finally:
+            # Unblocking pool task feeder if stopped early  
+            tasks.put(None)
+            results.close()
+
+        # Note: Validation first, see above
+        for stage in stages.values(): 
+            if len(stage.results) > 0: sync_block(stage)
+
+        self._save_structure()
+        for stage in stages.values():
+            self._log_stage(stage.statuses, len(stage.next_jobs), stage.name)
+
+        return stages['execute'].next_jobs
+
     def run(self):
 
         logger = self.logger
-        n_procs = self._args.num_procs
 
-        logger.banner("Validating Jobs")
         list_args = self._table.prep_list_job_args()
-        jobs = [self._jtype(*args, self._args, self._jmaps, self._mlogs, self._logger) for args in list_args]
+        # Note: Completed jobs are re-run in refresh mode, see Job.__init__
+        if not self._is_refresh: list_args = self.__skip_completed(list_args)
+        contexts = self._prep_job_contexts(list_args)
+        jobs = [self._jtype(*args, self._args, self._jmaps, self._mlogs, self._logger, context=c) 
+                for args, c in zip(list_args, contexts)]
 
         def log_callback(rtnval):
 
             msg = rtnval.status.name
             logger.info("Job %s [%s] path: %s" % (rtnval.leaf_id, msg, rtnval.dpath))
 
-        results = eparallel([j.validate for j in jobs], n_procs, 'Validating', callback=log_callback)
-        jobs = self._update_jobs(jobs, results, 'validation')
+        # Note: Only changed rows are written during stages, see Table.sync_data
+        self._table.write_data()
+
+        # Note: Pool is created after jobs so they are handed to workers once
+        args = self._args
+        if args.executor == 'pool' or args.pipeline:
 
-        logger.banner("Executing Jobs")
-        results = eparallel([j.execute for j in jobs], n_procs, 'Executing ', callback=log_callback)
-        jobs = self._update_jobs(jobs, results, self._name)
+            # Note: Pipeline tasks are only queued once earlier tasks complete, a pool 
+            #       waiting to fill a chunk with tasks not yet queued never returns
+            chunksize = args.chunksize
+            if args.pipeline and chunksize > 1:
+                logger.warning("Chunk size of %d not supported in pipeline mode, using 1." % chunksize)
+                chunksize = 1
+
+            initializer, initargs = self._mlogs.worker_init()
+            self._executor = Executor({j._leaf_id: j for j in jobs}, args.num_procs, 
+                                      chunksize, args.max_inflight, initializer, initargs)
+
+        try:
+            if args.pipeline:
+                logger.banner("Validating & Executing Jobs")
+                jobs = self._run_pipeline(jobs, log_callback)
+            else:
+                logger.banner("Validating Jobs")
+                jobs = self._run_jobs(jobs, 'validate', 'Validating', 'validation', log_callback)
+
+                logger.banner("Executing Jobs")
+                jobs = self._run_jobs(jobs, 'execute', 'Executing ', self._name, log_callback)
+        finally:
+            if not self._executor is None: self._executor.close()
+            self._executor = None
+            self._table.write_data()
+            # Note: Workers have exited, remaining job log records are written out
+            self._mlogs.close()
 
 
     def __init_directory(self):
@@ -195,6 +385,7 @@ class Batch(ABC):
 
         self._name = name
         self._args = self.__parse_batch_cmd_args() 
+        self._executor = None
 
         self._is_refresh = self._args.refresh
         self._is_backlog = not self._args.no_backup
@@ -209,6 +400,7 @@ class Batch(ABC):
         self.__check_inherited_method('parse_cmd_args', Batch)
         self._dpaths, self._fpaths = self.__init_directory()
         self._logger, self._mlogs = self.__init_logger(multi_logger, log_lvl)
+        self._is_continue = self._mlogs.is_continue
 
         # Correct logger has estabilished 
         logger = self._logger
@@ -235,11 +427,49 @@ class Batch(ABC):
         # Syncing directory stucture to table  data
         if self._is_tmaps: self._table.sync_table_maps(self)
 
+        # Replacing tree of nodes with array backed tree once it no longer changes
+        if self._args.compact_tree:
+            self._dstruc = directory.CompactTree(self._dstruc)
+            self._table.rebind(self._dstruc)
+            self._dstruc.release_nodes()
+            logger.info("Directory tree converted to compact representation.")
+
     
     ##########################
     #    Internal Methods    #
     ##########################
 
+    def __skip_completed(self, list_args):
+
+        logger = self.logger
+
+        # Note: Checking flag files without constructing jobs
+        is_flag = [self._jtype.is_complete(dpath) for _, dpath, _ in list_args]
+        if not self._is_continue and not any(is_flag): return list_args
+
+        logger.banner("Restoring Completed Jobs")
+
+        # Note: Flags without results saved by previous run are stale, e.g., output 
+        #       directory deleted, those jobs are validated and executed again
+        is_done = [f and self._table.is_restorable(leaf_id) for (leaf_id, _, _), f in zip(list_args, is_flag)]
+        stale = [dpath for (_, dpath, _), f, d in zip(list_args, is_flag, is_done) if f and not d]
+        for dpath in stale: self._jtype.remove_flag(dpath)
+        if len(stale) > 0: 
+            logger.warning("%d jobs flagged as completed have no saved results, re-running them." % len(stale))
+
+        completed = [(leaf_id, dpath) for (leaf_id, dpath, _), d in zip(list_args, is_done) if d]
+
+        n, nc = len(list_args), len(completed)
+        p = 100.0*nc/n if n > 0 else 0.0
+        logger.info("%d/%d [%.1f%%] jobs completed in previous run, skipping them." % (nc, n, p))
+
+        if nc > 0:
+            prev_tree = directory.Structure.load_from_file(self.dpaths.out, logger)
+            self._table.restore_completed(completed, prev_tree)
+            logger.info("Results of completed jobs restored.")
+
+        return [a for a, d in zip(list_args, is_done) if not d]
+
     # Required arugments for batching
     def __parse_batch_cmd_args(self):
   
@@ -257,6 +487,23 @@ class Batch(ABC):
                             help="Backup and start fresh run and re-run completed jobs.")
         parser.add_argument('--no-backup', action='store_true',
                             help="Turn off backup feature.")
+        parser.add_argument('--no-crawl-cache', action='store_true',
+                            help="Rescan all directories instead of reusing ones unchanged since last crawl.")
+        parser.add_argument('--crawl-workers', type=int, default=1,
+                            help="Number of threads crawling top level subdirectories concurrently. Default: %d." % 1)
+        parser.add_argument('--compact-tree', action='store_true',
+                            help="Store directory tree in compact arrays after crawling and matching to table.")
+        parser.add_argument('--executor', type=str, default='simple', choices=['simple', 'stream', 'pool'],
+                            help="Parallel execution mode, 'stream' collects results as jobs complete and "\
+                                 "'pool' also reuses one pool with resident jobs for all stages. Default: %s." % 'simple')
+        parser.add_argument('--chunksize', type=int, default=1,
+                            help="Number of jobs sent to a process at once in 'stream'/'pool' mode, always 1 with --pipeline. Default: %d." % 1)
+        parser.add_argument('--max-inflight', type=int, default=None,
+                            help="Maximum number of uncollected jobs in 'stream'/'pool' mode. Default: no limit.")
+        parser.add_argument('--pipeline', action='store_true',
+                            help="Execute each job as soon as it is validated using a 'pool' executor.")
+        parser.add_argument('--update-size', type=int, default=100,
+                            help="Number of completed jobs per table update in 'stream'/'pool' mode. Default: %d." % 100)
 
 
         # Note: Better solution?
@@ -265,6 +512,7 @@ class Batch(ABC):
             parser.add_argument('-tp', '--table-path', type=str,
                                 help="Path to support table." )
 
+        parser = self._parse_model_cmd_args(parser)
         return self.parse_cmd_args(parser).parse_args()
 
     def __check_inherited_method(self, meth_name, base_cls, is_restricted=False):
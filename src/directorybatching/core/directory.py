@@ -1,7 +1,9 @@
 import directorybatching.core.status as status
+from directorybatching.core.state import TreeState, node_row
+from directorybatching.core.parser import parser_config
 import copy
 import os
-from anytree import Node, RenderTree, AsciiStyle, PostOrderIter
+from anytree import Node, RenderTree, AsciiStyle, PostOrderIter, PreOrderIter
 from abc import ABC, abstractmethod
 import numpy as np
 import logging
@@ -11,6 +13,9 @@ import pandas as pd
 from types import SimpleNamespace
 import pickle
 import sys
+import threading
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 
 class Map:
 
@@ -30,6 +35,39 @@ class Map:
 
 LEAF_ID_COLUMN = 'batch_dir_leaf_id'
 STATUS_COLUMN  = 'status'
+STATUS_ID_COLUMN = 'batch_status_id'
+STATE_FNAME = 'directory_state.sqlite'
+
+# Width of leaf IDs, see stable_leaf_id
+# Note: Well below the int64 range and exact as a float, collisions are checked  
+LEAF_ID_BITS = 52
+
+def stable_leaf_id(items):
+    """Deterministic ID of leaf of LEAF_ID_BITS bits, same across processes and runs
+
+    :param items: (name, value) pairs of leaf from root, values normalized by
+                  leaf_id_items or leaf_ids_from_df
+    :type  items: iterable
+
+    :rtype: int
+    """
+    string = '/'.join('%s=%s' % item for item in items)
+    digest = hashlib.blake2b(string.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little') & ((1 << LEAF_ID_BITS) - 1)
+
+def _norm_value(dmap, val):
+    # Note: Decimal values are hashed by their integer key so float noise does not change ids
+    if dmap.parser.dtype is float: val = dmap.parser.to_key(val)
+    return val.item() if isinstance(val, np.generic) else val
+
+def leaf_ids_from_df(dmaps, df):
+    """Stable IDs of table rows from their directory map values, see stable_leaf_id"""
+    cols = []
+    for m in dmaps:
+        vals = df[m.name].to_numpy()
+        cols.append((m.parser.to_keys(vals) if m.parser.dtype is float else vals).tolist())
+    names = [m.name for m in dmaps]
+    return np.array([stable_leaf_id(zip(names, row)) for row in zip(*cols)], dtype=np.int64)
 
 class Status(status.Base):
 
@@ -67,6 +105,84 @@ def _test_parser(func, name, value, is_last):
     return True, "[SUCCESS]: Input: %s | Output: %s " % (value, rtn_dict)
 
 
+class CrawlCache:
+
+    """Persisted index of subdirectory names and parsed values keyed by directory path 
+
+    A directory is only rescanned and its subdirectory names reparsed if its 
+    modification time changed, i.e., subdirectories were added, removed or renamed.
+    """
+
+    VERSION = 1
+
+    def __init__(self, fpath, maps, is_load=True):
+
+        self._fpath = fpath
+        # Note: Cache is discarded if any map or parser settings changed
+        self._key = (CrawlCache.VERSION, tuple((m.name, m.dir_name, parser_config(m.parser)) for m in maps))
+        self._entries = {}
+        self._old_entries = self.__load() if is_load else {}
+
+        self._n_hits = 0
+        self._n_misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def n_hits(self): return self._n_hits
+
+    @property
+    def n_misses(self): return self._n_misses
+
+    def __load(self):
+
+        if not os.path.isfile(self._fpath): return {}
+
+        try:
+            with open(self._fpath, 'rb') as f: key, entries = pickle.load(f)
+        except Exception as e:
+            return {}
+
+        return entries if key == self._key else {}
+
+    def scan(self, dpath, parse, exclude=None):
+
+        """Parsed subdirectories of directory, from cache if directory is unchanged
+
+        :param dpath:   Path to directory.
+        :type  dpath:   str
+        :param parse:   Function parsing list of subdirectory names.
+        :type  parse:   function
+        :param exclude: Subdirectory name to ignore. 
+        :type  exclude: str
+
+        :rtype: list of (name, parsed value) tuples
+        """
+
+        mtime = os.stat(dpath).st_mtime_ns
+        entry = self._old_entries.get(dpath)
+
+        is_hit = not entry is None and entry[0] == mtime
+
+        if not is_hit:
+            names = [f.name for f in os.scandir(dpath) if f.is_dir() and not f.name == exclude]
+            entry = (mtime, list(zip(names, parse(names))))
+
+        # Note: Lock as directories may be crawled concurrently, only keeping 
+        #       visited directories so removed ones are pruned
+        with self._lock:
+            if is_hit: 
+                self._n_hits += 1
+            else:
+                self._n_misses += 1
+            self._entries[dpath] = entry
+
+        # Copying as parsed values are modified when building tree 
+        return copy.deepcopy(entry[1])
+
+    def save(self):
+        with open(self._fpath, 'wb') as f: pickle.dump((self._key, self._entries), f)
+
+
 class Structure:
 
     def __init__(self, batch):
@@ -84,32 +200,111 @@ class Structure:
 
         self._root = Node(root_dpath, is_valid=Status.VALID, dpath=root_dpath, is_vleaf=False)
         self._n_updates = 0
+
+        # Cached leafs, see _invalidate_leafs, and leafs by leaf ID
+        self._leafs = None
+        self._vleafs = None
+        self._leaf_index = {}
+
+        # Leafs with changed status since last status roll up
+        self._dirty = set()
+        self._is_rolled_up = False
+
+        # Saved state of tree, only nodes changed since last save are written
+        # unless tree structure changed, see save_to_file
+        self._state = TreeState(os.path.join(self._dpaths.out, STATE_FNAME))
+        self._changed = set()
+        self._is_state_full = True
+
+        # Note: Cache is ignored, but rebuilt, if turned off 
+        fpath = os.path.join(self._dpaths.out, 'crawl_cache.pkl')
+        self._crawl = CrawlCache(fpath, dmaps, is_load=not batch._args.no_crawl_cache)
+        self._n_crawl = batch._args.crawl_workers
+
         self.__build_tree(root_dpath, dmaps)
+
+        self._crawl.save()
+        self._logger.info("Crawl cache: %d directories reused, %d scanned." % (self._crawl.n_hits, self._crawl.n_misses))
+        # Note: Only needed while crawling 
+        self._crawl = None
         self.__check_tree_depth(dmaps)
 
         self._dtypes = {m.name: m.parser.dtype for m in dmaps}
+        self.__assign_leaf_ids()
 
     @property
     def dpaths(self): return self._dpaths
 
     @property
     def leafs(self):
-        return [n for n in PostOrderIter(self._root, filter_=lambda n: n.is_leaf)]
+        if self._leafs is None:
+            self._leafs = [n for n in PostOrderIter(self._root, filter_=lambda n: n.is_leaf)]
+        return self._leafs
 
     @property
     def vleafs(self):
-        return [n for n in PostOrderIter(self._root, filter_=lambda n: n.is_vleaf)]
+        if self._vleafs is None:
+            self._vleafs = [n for n in PostOrderIter(self._root, filter_=lambda n: n.is_vleaf)]
+        return self._vleafs
+
+    def get_leaf(self, leaf_id):
+        if not leaf_id in self._leaf_index:
+            self._logger.error("No leaf with ID '%s'." % leaf_id, KeyError)
+        return self._leaf_index[leaf_id]
+
+    def _invalidate_leafs(self):
+        # Note: Required after any change to tree structure 
+        self._leafs = None
+        self._vleafs = None
+        self._is_rolled_up = False
+        self._is_state_full = True
 
     def save_to_file(self):
-        fpath = os.path.join(self._dpaths.out, 'directory_tree.pkl')
 
-        logger = self._logger
-        dmaps = self._dmaps
-        self._logger = None
-        self._dmaps = None
-        pickle.dump(self, open(fpath, 'wb'))
-        self._logger = logger
-        self._dmaps = dmaps
+        is_full = self._is_state_full
+        if is_full:
+            nodes = list(PreOrderIter(self._root))
+            self._node_ids = {id(n): i for i, n in enumerate(nodes)}
+        else:
+            nodes = self._changed
+
+        rows = [self.__state_row(n) for n in nodes]
+        self._state.save(rows, is_full)
+
+        self._changed = set()
+        self._is_state_full = False
+
+    def __state_row(self, n):
+        ids = self._node_ids
+        leaf_id = getattr(n, 'leaf_id', None) if n.is_leaf else None
+        return node_row(ids[id(n)], None if n.is_root else ids[id(n.parent)], n.name, 
+                        getattr(n, 'bname', None), getattr(n, 'dpath', None), leaf_id, 
+                        n.is_leaf, n.is_vleaf, getattr(n, 'rtnval', None), 
+                        getattr(n, 'status', None), n.is_valid)
+
+    @classmethod
+    def load_from_file(cls, dpath, logger):
+
+        """Loads leafs of tree saved by previous run, either by a Structure or CompactTree
+
+        :param dpath:  Path to batch output directory.
+        :type  dpath:  str
+        :param logger: Logger for warnings. 
+        :type  logger: BaseLogger
+
+        :rtype: SimpleNamespace with leafs, see TreeState.load, or None if no readable saved tree 
+        """
+
+        fpath = os.path.join(dpath, STATE_FNAME)
+        if not os.path.isfile(fpath): 
+            logger.warning("No directory tree saved by previous run at '%s'." % fpath)
+            return None
+
+        try:
+            return TreeState.load(fpath)
+        except Exception as e:
+            logger.warning("Could not load directory tree saved by previous run at '%s': %s" % (fpath, e))
+            return None
 
 
 
@@ -122,11 +317,15 @@ class Structure:
 
         if not ids is None: raise NotImplementedError()
    
+        # Note: IDs are assigned once after crawling, see __assign_leaf_ids
         leafs = self.leafs
-        if ids is None: ids = list(range(len(leafs)))
+        if ids is None: ids = [l.leaf_id for l in leafs]
 
         data = [self.__leaf_to_dict(*x) for x in zip(leafs, ids)]
         map = {r[LEAF_ID_COLUMN]: l for r, l in zip(data,leafs)}
+
+        for id, l in map.items(): l.leaf_id = id
+        self._leaf_index = map.copy()
         
         df = pd.DataFrame.from_records(data).astype(self._dtypes)
         df[LEAF_ID_COLUMN] = df[LEAF_ID_COLUMN].astype(np.int_)
@@ -135,19 +334,41 @@ class Structure:
     def get_leaf_id(self, l):
 
         if not l.is_leaf: raise Exception() 
+        return stable_leaf_id(self.leaf_id_items(l))
 
-        input = ()
-        while not l.is_root:
-            input += (l.bname, l.rtnval[l.bname])
-            l = l.parent
+    def leaf_id_items(self, l):
+
+        # Levels below directory maps are virtual leafs, e.g., job ids
+        dmaps = self._dmaps
+        items = []
+        for i, n in enumerate(l.path[1:]):
+            rtnval = n.rtnval
+            if rtnval is None:
+                items.append((n.bname, n.name))
+            elif i < len(dmaps):
+                items.append((dmaps[i].name, _norm_value(dmaps[i], rtnval[n.bname])))
+            else:
+                items.append((n.bname, rtnval[n.bname]))
+
+        return items
+
+    def __assign_leaf_ids(self):
 
-        return hash(input) % ((sys.maxsize + 1)*2)
+        logger = self._logger
+        index = {}
+        for l in self.leafs:
+            id = self.get_leaf_id(l)
+            if id in index:
+                logger.critical("Leaf ID %d of '%s' collides with leaf '%s', directories parse to "\
+                                "the same values." % (id, l.dpath, index[id].dpath), ValueError)
+            index[id] = l
+            l.leaf_id = id
         
 
     def __leaf_to_dict(self, l, id):
 
-        total = {LEAF_ID_COLUMN: id, 
-                 STATUS_COLUMN : l.status} 
+        total = {LEAF_ID_COLUMN  : id, 
+                 STATUS_ID_COLUMN: self._smaps.get_id(l.status)} 
         hash_input = ()
         while not l.is_root:
             total.update(l.rtnval)
@@ -158,68 +379,97 @@ class Structure:
 
     def update_from_table(self, df):
 
-        COMPARE_TAG = "%s__TEMP_COMPARE__"
-        info =[]
+        # Note: Decimal values are matched on their integer keys, see ValidatorParser.to_key
+        keys = []
         for m in self._dmaps:
             p = m.parser
-            if p.dtype is float:
-                compare_col = COMPARE_TAG % m.name
-                df[compare_col]=df[m.name].apply(p.raw_reverse)
-            else:
-                compare_col = m.name
-            info.append((m, compare_col))
+            vals = df[m.name].to_numpy()
+            keys.append(p.to_keys(vals) if p.dtype is float else vals)
             
-        count, map = self._update_from_table(self._root, df, info)
-
-        return count, map 
-
-    def _update_from_table(self, p, df, info):
+        count, map = self._update_from_table(df, keys)
 
-        if len(info) == 0: return 0, None 
+        self._invalidate_leafs()
+        if not map is None:
+            for id, l in map.items(): l.leaf_id = id
+            self._leaf_index.update(map)
 
-        dmap, comp_col = info[0]
-        logger = self._logger
+        return count, map 
 
-        if np.any([not c.bname==dmap.dir_name for c in p.children]):
-            raise logger.critical("Directory maps order didn't match "\
-                                  "tree structure.", TypeError)
+    def _update_from_table(self, df, keys):
 
-        t_vals = np.unique(df[comp_col].values)
-        d_vals = [c.rtnval[dmap.name] for c in p.children]
+        dmaps = self._dmaps
+        if len(dmaps) == 0: return 0, None 
 
-        is_float = dmap.parser.dtype is float
-        if is_float:
-            reverse = dmap.parser.raw_reverse
-            d_vals = [reverse(v) for v in d_vals]
+        index = self.__build_path_index()
 
-        new_vals = [v for v in t_vals if not v in d_vals]
+        # Note: Groups are sorted so new siblings are added in ascending order 
+        df_keys = pd.DataFrame({i: k for i, k in enumerate(keys)})
+        groups = df_keys.groupby(list(df_keys.columns), sort=True).indices
 
-        is_last = len(info) == 1
+        leaf_ids = df[LEAF_ID_COLUMN].to_numpy()
+        status_ids = df[STATUS_ID_COLUMN].to_numpy()
+        nl = len(dmaps) - 1
 
-        id_maps = {}
-        if len(new_vals) > 0:
-            for val in new_vals:
-                tmp = self.__add_table_node(p, val, df, dmap, is_float, is_last)
-                if not tmp is None: id_maps.update(tmp)
-        
         n_count = 0
-        for c in p.children:
-            val = c.rtnval[c.bname]
-            if is_float: val = reverse(val)
-            sub_df = df[df[comp_col]==val]
-            if len(sub_df) == 0: continue
-            n, tmp = self._update_from_table(c, sub_df, info[1:])
-            n_count += n
-            if not tmp is None: id_maps.update(tmp)
-
-        return len(new_vals) if is_last else n_count, id_maps
+        id_maps = {}
+        for path, rows in groups.items():
+            if not type(path) is tuple: path = (path,)
+            # Note: Status and id are taken from the first row of the new leaf 
+            i = rows[0]
 
-    def __add_table_node(self, p, val, df, dmap, is_float, is_last):
+            p = self._root
+            for depth, dmap in enumerate(dmaps):
+                sub_path = path[:depth+1]
+                c = index.get(sub_path)
+
+                if c is None:
+                    is_float = dmap.parser.dtype is float
+                    is_last = depth == nl
+                    args = (p, path[depth], leaf_ids[i], status_ids[i], dmap, is_float, is_last)
+                    c, tmp = self.__add_table_node(*args)
+                    index[sub_path] = c
+                    if is_last:
+                        n_count += 1
+                        id_maps.update(tmp)
+                p = c
+
+        return n_count, id_maps
+
+    def __build_path_index(self):
+
+        # Nodes by path of values, or their keys, from root built once for all rows
+        logger = self._logger
+        dmaps = self._dmaps
+        index = {}
+        stack = [(self._root, ())]
+
+        while len(stack) > 0:
+            p, path = stack.pop()
+            depth = len(path)
+            if depth == len(dmaps) or p.is_leaf: continue 
+
+            dmap = dmaps[depth]
+            if np.any([not c.bname==dmap.dir_name for c in p.children]):
+                raise logger.critical("Directory maps order didn't match "\
+                                      "tree structure.", TypeError)
+
+            to_key = dmap.parser.to_key if dmap.parser.dtype is float else None
+            for c in p.children:
+                # Note: Subdirectories that did not parse have no value
+                rtnval = c.rtnval
+                if rtnval is None or not dmap.name in rtnval: continue
+                val = rtnval[dmap.name]
+                if not to_key is None: val = to_key(val)
+                c_path = path + (val,)
+                index[c_path] = c
+                stack.append((c, c_path))
+
+        return index
+
+    def __add_table_node(self, p, val, leaf_id, status_id, dmap, is_float, is_last):
 
         logger = self._logger 
-        if is_float:
-            forward = dmap.parser.raw_forward
-            val = forward(val)
+        if is_float: val = dmap.parser.from_key(val)
         
         has_preproc = dmap.parser.has_preprocessor
         rtnval = {dmap.name: val}
@@ -227,8 +477,7 @@ class Structure:
 
 
         is_vleaf = is_last and has_preproc
-        status = df.iloc[0][STATUS_COLUMN] if is_last and not is_vleaf else None
-        leaf_id = df.iloc[0][LEAF_ID_COLUMN]
+        status = self._smaps.get_status(status_id) if is_last and not is_vleaf else None
 
         args = (False, None, status, dmap.name, is_vleaf, rtnval)
         attrs = Structure.__gen_node_attrs(*args)
@@ -237,7 +486,7 @@ class Structure:
         logger.debug("Added node %s" % c)
 
         if is_vleaf:
-            status = df.iloc[0][STATUS_COLUMN]
+            status = self._smaps.get_status(status_id)
             is_vleaf = False 
             name = "__DUMMY__"
             rtnval = {dmap.parser._preproc.name: "__DUMMY__"} 
@@ -246,9 +495,9 @@ class Structure:
             attrs = Structure.__gen_node_attrs(*args)
             gc = Node(name, c, **attrs)
             logger.debug("Added virtual node %s" % gc)
-            return {leaf_id: gc}
+            return c, {leaf_id: gc}
 
-        if is_last: return {leaf_id: c}
+        return c, {leaf_id: c} if is_last else None
 
 
 
@@ -256,37 +505,73 @@ class Structure:
     # Internal methods #
     ####################
 
-    def _update_status(self, p=None):
-        if p is None: 
-            p = self._root
-            self._n_updates += 1
+    def mark_dirty(self, node):
+        # Leaf whose status changed, see _update_status
+        self._dirty.add(node)
+        self._changed.add(node)
 
-        if not p.is_leaf or p.is_vleaf:
+    def _update_status(self):
 
-            ids, is_valids = zip(*[self._update_status(c) for c in p.children])
+        # Full roll up after structural changes, otherwise only 
+        # recomputing ancestors of leafs marked as dirty
+        if not self._is_rolled_up:
+            self._dirty.clear()
+            self.__rollup(self._root)
+            self._is_rolled_up = True
+            self._is_state_full = True
+            return
 
-            self._is_valid = is_valid = Status.max(is_valids)
+        ancestors = {}
+        for l in self._dirty:
+            n = l.parent
+            while not n is None and not id(n) in ancestors:
+                ancestors[id(n)] = n
+                n = n.parent
 
-            id_max = np.max(ids)
-            id_min = np.min(ids)
+        self._dirty.clear()
+        self._changed.update(ancestors.values())
 
-            p._status_max = self._smaps.get_status(id_max)
-            p._status_min = self._smaps.get_status(id_min)
+        # Bottom up so children are updated before their parents
+        for n in sorted(ancestors.values(), key=lambda n: n.depth, reverse=True):
+            self.__rollup_node(n, [self.__get_rollup(c) for c in n.children])
 
-            p.status = p._status_max
-            id = id_max
+    def __get_rollup(self, p):
 
-        else:
+        if not p.is_leaf or p.is_vleaf: return p._rollup
 
-            id = self._smaps.get_id(p.status)
-            is_valid   = p.is_valid
-          
-            if type(p.is_valid) is bool:
-                is_valid = Status.VALID if is_valid else Status.INVALID
-                p.is_valid = is_valid
+        id = self._smaps.get_id(p.status)
+        is_valid   = p.is_valid
+      
+        if type(p.is_valid) is bool:
+            is_valid = Status.VALID if is_valid else Status.INVALID
+            p.is_valid = is_valid
 
         return id, is_valid
 
+    def __rollup_node(self, p, rollups):
+
+        ids, is_valids = zip(*rollups)
+
+        self._is_valid = is_valid = Status.max(is_valids)
+
+        id_max = max(ids)
+        id_min = min(ids)
+
+        p._status_max = self._smaps.get_status(id_max)
+        p._status_min = self._smaps.get_status(id_min)
+
+        p.status = p._status_max
+        p._rollup = (id_max, is_valid)
+
+        return p._rollup
+
+    def __rollup(self, p):
+
+        if not p.is_leaf or p.is_vleaf:
+            return self.__rollup_node(p, [self.__rollup(c) for c in p.children])
+
+        return self.__get_rollup(p)
+
     def print_tree_status(self, name=None):
 
         marks = {Status.VALID  : colored('✓', 'green' ),
@@ -305,6 +590,7 @@ class Structure:
 
     def filter_valid(self, name=None):
 
+        self._n_updates += 1
         self._update_status()
         self.print_tree_status(name)
 
@@ -327,6 +613,8 @@ class Structure:
             logger.critical("Can not remove leaf as it is not a leaf, '%s%'" % l.dpath)
 
         p = l.parent
+        self._invalidate_leafs()
+        self._leaf_index.pop(getattr(l, 'leaf_id', None), None)
 
         nb = len(p.children)
         p.children = (c for c in p.children if not c==l)
@@ -342,7 +630,7 @@ class Structure:
 
         if na == 0:
             logger.debug("Removed parent node '%s' since it has no children after removing child '%s'." % (p.dpath, l.name)) 
-            self.remove_leaf(p)
+            self.__remove_leaf(p)
 
     @classmethod
     def __gen_node_attrs(cls, is_valid, dpath, status, bname,
@@ -358,7 +646,14 @@ class Structure:
 
         return attrs
 
-    def __process_subdir(self, sub_dname, dpath, map, is_last):
+    def __scan_subdirs(self, dpath, map):
+
+        out_dname = os.path.basename(self._dpaths.out)
+        # Note: Siblings are parsed at once, see ValidatorParser.forward_many
+        parse = lambda sub_dnames: map.parser.forward_many(map.dir_name, sub_dnames)
+        return self._crawl.scan(dpath, parse, out_dname)
+
+    def __process_subdir(self, sub_dname, rtnval, dpath, map, is_last):
 
         def qreturn(is_valid, name=sub_dname, rtnvalue={}, is_vleaf=False): 
             args = (is_valid, sub_dpath, status, map.dir_name, is_vleaf, rtnval)
@@ -368,13 +663,6 @@ class Structure:
         logger = self._logger
         sub_dpath = os.path.join(dpath, sub_dname)
 
-        try:
-            rtnval = map.parser.forward(map.dir_name, sub_dname)
-        except Exception as e:
-            raise e
-            logger.config("Subfolder '%s' caused an error in the parser for directory map '%s' "\
-                          "at path '%s'." % (sub_dname, map.dir_name, dpath)                     )
-
         if rtnval is None: 
             logger.warning("Subfolder '%s' did not parse for directory map '%s' at "\
                            "path '%s'." % (sub_dname, map.dir_name, dpath)           )
@@ -414,8 +702,8 @@ class Structure:
 
         # Parsing subdirectory names 
         is_last = nmaps == 1
-        out_dname = os.path.basename(self._dpaths.out)
-        subinfo = [self.__process_subdir(f.name, dpath, maps[0], is_last) for f in os.scandir(dpath) if f.is_dir() and not f.name == out_dname]
+        subdirs = self.__scan_subdirs(dpath, maps[0])
+        subinfo = [self.__process_subdir(name, rtnval, dpath, maps[0], is_last) for name, rtnval in subdirs]
         is_vleaf_list, subinfo = zip(*subinfo)
 
         # Safety check 
@@ -430,7 +718,16 @@ class Structure:
 
             # Recursive calls to build child nodes 
             children = [Node(name, parent, **attrs) for name, attrs in subinfo]
-            for child in children: self.__build_tree(os.path.join(dpath,child.name), maps[1:], child)
+            subtrees = [(os.path.join(dpath,child.name), maps[1:], child) for child in children]
+
+            if is_root and self._n_crawl > 1:
+                # Crawling independent top level subtrees concurrently as crawl is bound by
+                # file system metadata calls, order of children is set above so merge 
+                # into tree is deterministic 
+                with ThreadPoolExecutor(self._n_crawl) as pool:
+                    for _ in pool.map(lambda args: self.__build_tree(*args), subtrees): pass
+            else:
+                for args in subtrees: self.__build_tree(*args)
 
         else:
             # Special case for final descendant which has a suffix
@@ -467,6 +764,7 @@ class Structure:
                 for name, attrs in subnodes[cname]['children']: Node(name, child, **attrs)
 
         if is_root:
+            self._invalidate_leafs()
             self.filter_valid("dir_mapping")
 
     def __check_tree_depth(self, maps):
@@ -491,13 +789,15 @@ class Structure:
         max_depth = max_depth_map
         if self._has_vleafs: max_depth += 1
         for l in self.leafs: l.status = Status.VALID if l.depth == max_depth else Status.INVALID
+        self._is_rolled_up = False
 
         self.filter_valid('depth_check')
 
     def __flatten_vleafs(self):
 
         vleafs = self.vleafs
-        for vl in self.vleafs:
+        self._invalidate_leafs()
+        for vl in vleafs:
             
             min_status = min([c.status for c in vl.children])
 
@@ -521,3 +821,340 @@ class Structure:
 
                 break
 
+
+
+class NodeView:
+
+    """Lightweight stand-in for an anytree node of a CompactTree
+
+    Attributes are read from and written to the arrays of the tree, attributes 
+    not stored in arrays, e.g., job files, are kept in a sparse dictionary. 
+    """
+
+    __slots__ = ('_tree', '_index')
+
+    def __init__(self, tree, index):
+        object.__setattr__(self, '_tree' , tree )
+        object.__setattr__(self, '_index', index)
+
+    @property
+    def index(self): return self._index
+
+    @property
+    def name(self): return self._tree._names[self._index]
+
+    @property
+    def dpath(self): return self._tree._node_dpaths[self._index]
+
+    @property
+    def depth(self): return int(self._tree._depths[self._index])
+
+    @property
+    def is_leaf(self): return bool(self._tree._is_leaf[self._index])
+
+    @property
+    def is_vleaf(self): return bool(self._tree._is_vleaf[self._index])
+
+    @property
+    def is_valid(self): return Status.get_by_id(self._tree._is_valid_ids[self._index])
+
+    @property
+    def status(self): return self._tree._get_status(self._index)
+
+    @status.setter
+    def status(self, status): self._tree._set_status(self._index, status)
+
+    @property
+    def rtnval(self): 
+        # Note: Stored once accessed so in place updates are kept
+        extras = self._tree._extras.setdefault(self._index, {})
+        if not 'rtnval' in extras: extras['rtnval'] = self._tree._get_rtnval(self._index)
+        return extras['rtnval']
+
+    def __reduce__(self): return (NodeView, (self._tree, self._index))
+
+    def __getattr__(self, name):
+        # Note: Slots are not set yet while unpickling 
+        if name in NodeView.__slots__: raise AttributeError(name)
+        extras = self._tree._extras.get(self._index, {})
+        if not name in extras: raise AttributeError(name)
+        return extras[name]
+
+    def __setattr__(self, name, value):
+        prop = getattr(type(self), name, None)
+        if isinstance(prop, property): 
+            if prop.fset is None: raise AttributeError("Can not set attribute '%s'." % name)
+            return prop.fset(self, value)
+        self._tree._extras.setdefault(self._index, {})[name] = value
+
+    def __repr__(self): return "NodeView(%d, '%s')" % (self._index, self.dpath)
+
+
+class CompactTree:
+
+    """Array backed representation of a crawled directory Structure 
+
+    Nodes are stored in pre-order as a parent index array with interned names and
+    parsed values and integer (Chained) status ids, leaf indices are computed once.
+    Exposes the Structure operations used after the table is constructed. 
+    """
+
+    def __init__(self, struc):
+
+        self._dpaths = struc._dpaths
+        self._logger = struc._logger
+        self._smaps = struc._smaps
+        self._dtypes = struc._dtypes
+        self._n_updates = struc._n_updates
+        self._has_vleafs = struc._has_vleafs
+
+        nodes = list(PreOrderIter(struc._root))
+        n = len(nodes)
+        index = {id(node): i for i, node in enumerate(nodes)}
+        # Note: Kept until views are created, see views 
+        self._index = index
+
+        self._parents = np.array([-1 if node.is_root else index[id(node.parent)] for node in nodes], dtype=np.int64)
+        self._depths = np.array([node.depth for node in nodes], dtype=np.int16)
+        self._is_leaf = np.array([node.is_leaf for node in nodes], dtype=bool)
+        self._is_vleaf = np.array([node.is_vleaf for node in nodes], dtype=bool)
+        self._is_last = np.array([node.is_root or node.parent.children[-1] is node for node in nodes], dtype=bool)
+
+        # Interning repeated strings and parsed values  
+        def intern(vals):
+            table = {}
+            codes = np.array([table.setdefault(v, len(table)) for v in vals], dtype=np.int64)
+            return list(table.keys()), codes
+
+        self._name_table, self._name_codes = intern([node.name for node in nodes])
+        self._bname_table, self._bname_codes = intern([getattr(node, 'bname', None) for node in nodes])
+        self._dpath_list = [getattr(node, 'dpath', None) for node in nodes]
+
+        def rtnval_key(node):
+            rtnval = getattr(node, 'rtnval', None)
+            return None if rtnval is None else tuple(rtnval.items())
+
+        self._rtnval_table, self._rtnval_codes = intern([rtnval_key(node) for node in nodes])
+
+        def is_valid_id(node):
+            is_valid = node.is_valid
+            if type(is_valid) is bool: is_valid = Status.VALID if is_valid else Status.INVALID
+            return is_valid.id
+
+        self._is_valid_ids = np.array([is_valid_id(node) for node in nodes], dtype=np.int8)
+
+        # Note: Root and unset statuses are marked as -1 
+        get_id = self._smaps.get_id
+        self._status_ids = np.array([get_id(node.status) if not getattr(node, 'status', None) is None else -1 for node in nodes], dtype=np.int64)
+        self._status_min_ids = self._status_ids.copy()
+
+        # Cached leaf indices in leaf order of Structure.leafs 
+        self._leaf_indices = np.flatnonzero(self._is_leaf)
+        self._leaf_ids = np.array([nodes[i].leaf_id for i in self._leaf_indices], dtype=np.int64)
+        self._node_leaf_ids = dict(zip(self._leaf_indices.tolist(), self._leaf_ids.tolist()))
+        self._vleaf_indices = np.flatnonzero(self._is_vleaf)
+        self._is_valid = None
+
+        self._extras = {}
+        self._leaf_index = {}
+
+        # Statuses at last save, only changed nodes are written, see save_to_file
+        self._state = TreeState(os.path.join(self._dpaths.out, STATE_FNAME))
+        self._saved_ids = None
+
+    @property
+    def dpaths(self): return self._dpaths
+
+    @property
+    def _names(self): return _InternedList(self._name_table, self._name_codes)
+
+    @property
+    def _node_dpaths(self): return self._dpath_list
+
+    @property
+    def leaf_indices(self): return self._leaf_indices
+
+    @property
+    def leafs(self): return [NodeView(self, i) for i in self._leaf_indices]
+
+    @property
+    def vleafs(self): return [NodeView(self, i) for i in self._vleaf_indices]
+
+    def views(self, id_map):
+
+        """Converts map of IDs to anytree nodes of Structure used to construct 
+           tree to map of IDs to node views
+
+        :param id_map: Dictionary mapping IDs to nodes.
+        :type  id_map: dict
+
+        :rtype: dict
+        """
+
+        views = {k: NodeView(self, self._index[id(node)]) for k, node in id_map.items()}
+        for k, view in views.items(): view.leaf_id = k
+        self._leaf_index = views.copy()
+        return views
+
+    def get_leaf(self, leaf_id):
+        if not leaf_id in self._leaf_index:
+            self._logger.error("No leaf with ID '%s'." % leaf_id, KeyError)
+        return self._leaf_index[leaf_id]
+
+    def release_nodes(self): self._index = None
+
+    def _get_status(self, i):
+        id = self._status_ids[i]
+        return None if id < 0 else self._smaps.get_status(id)
+
+    def _set_status(self, i, status):
+        self._status_ids[i] = self._smaps.get_id(status)
+
+    def _get_rtnval(self, i):
+        rtnval = self._rtnval_table[self._rtnval_codes[i]]
+        return None if rtnval is None else dict(rtnval)
+
+    def save_to_file(self):
+
+        is_full = self._saved_ids is None
+        if is_full:
+            idx = range(len(self._parents))
+        else:
+            status_ids, is_valid_ids = self._saved_ids
+            is_changed = (self._status_ids != status_ids) | (self._is_valid_ids != is_valid_ids)
+            idx = np.flatnonzero(is_changed).tolist()
+
+        rows = [self.__state_row(i) for i in idx]
+        self._state.save(rows, is_full)
+        self._saved_ids = (self._status_ids.copy(), self._is_valid_ids.copy())
+
+    def __state_row(self, i):
+        p = int(self._parents[i])
+        return node_row(i, None if p < 0 else p, self._name_table[self._name_codes[i]],
+                        self._bname_table[self._bname_codes[i]], self._dpath_list[i], 
+                        self._node_leaf_ids.get(i), self._is_leaf[i], self._is_vleaf[i], 
+                        self._get_rtnval(i), self._get_status(i), 
+                        Status.get_by_id(self._is_valid_ids[i]))
+
+    ###########################
+    # Directory/Table Methods #
+    ###########################
+
+    def to_dataframe(self, ids=None):
+
+        if not ids is None: raise NotImplementedError()
+
+        leafs = self._leaf_indices
+        ids = self._leaf_ids.tolist()
+
+        def leaf_to_dict(i, id):
+            total = {LEAF_ID_COLUMN  : id, 
+                     STATUS_ID_COLUMN: self._status_ids[i]}
+            while self._parents[i] >= 0:
+                rtnval = self._get_rtnval(i)
+                if not rtnval is None: total.update(rtnval)
+                i = self._parents[i]
+            return total
+
+        data = [leaf_to_dict(i, id) for i, id in zip(leafs, ids)]
+        map = {id: NodeView(self, i) for i, id in zip(leafs, ids)}
+
+        for id, l in map.items(): l.leaf_id = id
+        self._leaf_index = map.copy()
+
+        df = pd.DataFrame.from_records(data).astype(self._dtypes)
+        df[LEAF_ID_COLUMN] = df[LEAF_ID_COLUMN].astype(np.int_)
+        return df, map
+
+    def update_from_table(self, df):
+        self._logger.critical("Method 'update_from_table' not supported by CompactTree, "\
+                              "convert Structure after syncing table.", NotImplementedError)
+
+    ####################
+    # Internal methods #
+    ####################
+
+    def mark_dirty(self, node):
+        # Note: Roll up is vectorized over whole tree, see _update_status
+        pass
+
+    def _update_status(self):
+
+        parents = self._parents
+        depths = self._depths
+        # Note: Virtual leafs are parents of their virtual nodes 
+        is_inner = ~self._is_leaf
+
+        status_ids = self._status_ids
+        status_min_ids = self._status_min_ids
+
+        # Note: Same as Structure roll up, inner nodes take the maximum status of their 
+        #       children and the minimum of their children's maximum statuses, validity 
+        #       of inner nodes is kept and only the rolled up validity of the root is used
+        is_valid_ids = self._is_valid_ids.astype(np.int64)
+
+        imax = np.iinfo(np.int64).max
+        status_ids[is_inner] = -1
+        status_min_ids[is_inner] = imax
+        is_valid_ids[is_inner] = -1
+
+        # Rolling up children to parents one depth at a time from the bottom
+        for d in range(int(depths.max()), 0, -1):
+            idx = np.flatnonzero(depths == d)
+            pidx = parents[idx]
+            np.maximum.at(status_ids    , pidx, status_ids[idx]  )
+            np.minimum.at(status_min_ids, pidx, status_ids[idx]  )
+            np.maximum.at(is_valid_ids  , pidx, is_valid_ids[idx])
+
+        self._is_valid = Status.get_by_id(is_valid_ids[0])
+
+    def print_tree_status(self, name=None):
+
+        marks = {Status.VALID.id  : colored('✓', 'green' ),
+                 Status.INVALID.id: colored('x', 'red'   ), 
+                 Status.PARTIAL.id: colored('-', 'yellow')}
+
+        log_fname = "filter_stage_%02d" % self._n_updates
+        if not name is None: log_fname += "_%s" % name
+        log_fname += ".text"
+        log_fpath = os.path.join(self.dpaths.logs, log_fname)
+
+        # Reproducing anytree.RenderTree prefixes from pre-order arrays 
+        conts = [''] * len(self._parents)
+        names = self._names
+        with open(log_fpath, 'w') as f:
+            for i, (p, is_last) in enumerate(zip(self._parents, self._is_last)):
+                if p < 0:
+                    pre = ''
+                else:
+                    pre = conts[p] + ('└── ' if is_last else '├── ')
+                    conts[i] = conts[p] + ('    ' if is_last else '│   ')
+
+                mark = marks[self._is_valid_ids[i]] 
+                f.write("%s [%s] %s\n" % (pre, mark, names[i]))
+
+    def filter_valid(self, name=None):
+
+        self._n_updates += 1
+        self._update_status()
+        self.print_tree_status(name)
+
+        are_valid = self._is_valid_ids[self._leaf_indices] == Status.VALID.id
+
+        nt = len(are_valid)
+        nv = np.sum(are_valid)
+        nr = nt - nv
+
+        self._logger.info("Removing %d out of %d leafs in filter stage %d '%s'."  % (nr, nt, self._n_updates, name))
+
+
+class _InternedList:
+
+    # Read only list-like access to interned values  
+    def __init__(self, table, codes):
+        self._table = table
+        self._codes = codes
+
+    def __getitem__(self, i): return self._table[self._codes[i]]
+
+    def __len__(self): return len(self._codes)
@@ -1,6 +1,8 @@
 
 
 import directorybatching.core.misc as misc
+import directorybatching.core.status as status
+from directorybatching.core.logger import get_worker_logger, flush_worker_logging
 from collections import namedtuple
 from abc import ABC, abstractmethod
 from types import SimpleNamespace
@@ -8,6 +10,14 @@ import os
 import logging
 #Map = namedtuple("JobMap", "name param")
 
+FLAG_FNAME = ".job_COMPLETE"
+
+class Status(status.Base):
+
+    COMPLETED = status.Tuple(0, "Previously completed")
+
+    def _is_valid(self): return self == Status.COMPLETED
+
 class Map:
     
     @property
@@ -24,10 +34,26 @@ class Map:
 
 class Job(ABC):
 
+    # Output subdirectory of job, used to find flag files without constructing jobs 
+    OUT_DNAME = 'postprocessing'
     
     @property
     def flag_fpath(self):
-        return os.path.join(self._out_dpath, ".job_COMPLETE")
+        return os.path.join(self._out_dpath, FLAG_FNAME)
+
+    @classmethod
+    def __flag_fpath(cls, dpath):
+        out_dpath = dpath if cls.OUT_DNAME is None else os.path.join(dpath, cls.OUT_DNAME)
+        return os.path.join(out_dpath, FLAG_FNAME)
+
+    @classmethod
+    def is_complete(cls, dpath):
+        return os.path.isfile(cls.__flag_fpath(dpath))
+
+    @classmethod
+    def remove_flag(cls, dpath):
+        fpath = cls.__flag_fpath(dpath)
+        if os.path.isfile(fpath): os.remove(fpath)
 
     @property
     def is_flag_file(self):
@@ -42,14 +68,16 @@ class Job(ABC):
         
     @property
     def logger(self):
-        return logging.getLogger(self.log_name)
+        # Note: In pool workers records are forwarded to the parent's log writer 
+        return get_worker_logger(self.log_name)
 
-    def __init__(self, leaf_id, dpath, params, args, maps, mlog, plogger, out_dname='postprocessing'):
+    def __init__(self, leaf_id, dpath, params, args, maps, mlog, plogger, out_dname=OUT_DNAME, context=None):
         self._leaf_id = leaf_id
         self._dpath   = dpath
         self._params  = params
         self._args    = args
         self._maps    = maps
+        self._context = context
 
         self._out_dpath = self._dpath if out_dname is None else misc.create_subdir(self._dpath, out_dname)
         self._log_fpath = log_fpath = os.path.join(self._out_dpath, 'log.txt')
@@ -61,7 +89,9 @@ class Job(ABC):
         lname = self.log_name
         is_refresh = args.refresh and os.path.isfile(log_fpath)
         if is_refresh: os.remove(log_fpath)
-        logger = mlog.new(lname, self._log_fpath, plogger, is_ignore=True)
+        # Note: Completed jobs are re-run in refresh mode
+        if args.refresh and self.is_flag_file: os.remove(self.flag_fpath)
+        logger = mlog.new(lname, self._log_fpath, plogger, is_ignore=True, is_shared=True)
 
         if is_refresh: logger.warning("Starting in refresh mode, old log deleted.")
 
@@ -77,6 +107,9 @@ class Job(ABC):
     @property
     def out_dpath(self): return self._out_dpath
 
+    @property
+    def context(self): return self._context
+
     @abstractmethod
     def validate(self, fpath, params): pass
 
@@ -108,6 +141,9 @@ class Job(ABC):
         self._new_params = {} 
         self._new_files = {}
 
+        # Sending buffered job logs before result is returned to parent 
+        flush_worker_logging()
+
         return rtnval
                 
 
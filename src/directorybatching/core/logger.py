@@ -7,10 +7,28 @@ from datetime import datetime
 import tarfile
 import shutil
 import collections
+import atexit
+import multiprocessing
+import logging.handlers
+import multiprocessing.util
+import threading
+
+# Optional faster compression of log backups, gzip is used otherwise 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 
 MULTI_LOGGER_FORMAT = '[%(asctime)s] (%(levelname)s) %(message)s'
 
+# Maximum number of log files kept open by the shared log writer 
+SHARED_MAX_OPEN_FILES = 64
+# Number of records a worker process buffers before sending them to the writer 
+WORKER_LOG_BATCH_SIZE = 64
+# Compression level of gzip log backups, used if zstandard is not installed 
+BACKUP_GZIP_LEVEL = 6
+
 # Custom log levels, see method addLoggingLevel at end of file
 #   BANNER - prettified 3 line banner for sectioning that alway show
 #   CONFIG - User error in configuring batch
@@ -98,6 +116,183 @@ class FileLogger(BaseLogger):
         return logger
 
 
+# Logger sending records to the shared log writer instead of its own file  
+class SharedFileLogger(BaseLogger):
+
+    @classmethod
+    def getLogger(cls, name, fpath, writer, lvl=logging.INFO, is_ignore=False, fmt=None):
+
+        # Casting logger 
+        logger = super().getLogger(name, is_ignore=is_ignore, lvl=lvl, fpath=fpath)
+        logger.__class__ = SharedFileLogger
+
+        # Configuring logger, file is only opened by the writer 
+        writer.register(name, fpath, fmt)
+        logger.addHandler(logging.handlers.QueueHandler(writer.queue))
+
+        return logger
+
+
+# Handler writing records to the file registered for the logger name, only
+# the most recently used files are kept open 
+class RoutingHandler(logging.Handler):
+
+    def __init__(self, max_open=SHARED_MAX_OPEN_FILES):
+        logging.Handler.__init__(self)
+        self._routes = {}
+        self._streams = collections.OrderedDict()
+        self._max_open = max_open
+
+    def register(self, name, fpath, formatter):
+        self._routes[name] = (fpath, formatter)
+
+    def emit(self, record):
+
+        route = self._routes.get(record.name)
+        if route is None: return
+        fpath, formatter = route
+
+        try:
+            stream = self._streams.pop(fpath, None)
+            if stream is None:
+                if len(self._streams) >= self._max_open:
+                    _, old = self._streams.popitem(last=False)
+                    old.close()
+                stream = open(fpath, 'a')
+
+            self._streams[fpath] = stream
+            stream.write(formatter.format(record) + "\n")
+            stream.flush()
+        except Exception:
+            self.handleError(record)
+
+    def close(self):
+        self.acquire()
+        try:
+            for stream in self._streams.values(): stream.close()
+            self._streams.clear()
+        finally:
+            self.release()
+        logging.Handler.close(self)
+
+
+# Queue handler sending records in batches, i.e., lists of records, to reduce 
+# IPC overhead, buffer is sent when full, on errors or when flushed 
+class BatchingQueueHandler(logging.handlers.QueueHandler):
+
+    def __init__(self, queue, capacity=WORKER_LOG_BATCH_SIZE, flush_lvl=logging.ERROR):
+        super().__init__(queue)
+        self._buffer = []
+        self._capacity = capacity
+        self._flush_lvl = flush_lvl
+
+    def emit(self, record):
+        try:
+            self._buffer.append(self.prepare(record))
+        except Exception:
+            self.handleError(record)
+            return
+
+        if len(self._buffer) >= self._capacity or record.levelno >= self._flush_lvl: 
+            self.flush()
+
+    def flush(self):
+        self.acquire()
+        try:
+            if len(self._buffer) > 0: self.enqueue(self._buffer)
+            self._buffer = []
+        finally:
+            self.release()
+
+    def close(self):
+        self.flush()
+        super().close()
+
+
+# Queue listener also accepting batches of records, see BatchingQueueHandler 
+class BatchQueueListener(logging.handlers.QueueListener):
+
+    def handle(self, record):
+        if type(record) is list:
+            for r in record: super().handle(r)
+        else:
+            super().handle(record)
+
+
+# Single writer for job logs, records are put on a multiprocessing queue, so 
+# pool workers can log too, and written by a listener thread in the parent 
+class SharedLogWriter:
+
+    def __init__(self, max_open=SHARED_MAX_OPEN_FILES):
+
+        self._queue = multiprocessing.Queue()
+        self._handler = RoutingHandler(max_open)
+        self._listener = BatchQueueListener(self._queue, self._handler)
+        self._listener.start()
+        self._is_closed = False
+
+        atexit.register(self.close)
+
+    @property
+    def queue(self): return self._queue
+
+    def register(self, name, fpath, fmt=None):
+        if fmt is None: fmt = MULTI_LOGGER_FORMAT
+        self._handler.register(name, fpath, logging.Formatter(fmt))
+
+    def close(self):
+
+        if self._is_closed: return
+        self._is_closed = True
+
+        # Note: Stopping listener writes remaining records in queue 
+        self._listener.stop()
+        self._handler.close()
+        self._queue.close()
+        self._queue.join_thread()
+        atexit.unregister(self.close)
+
+
+# Logging state of worker process, see init_worker_logging 
+_WorkerLogging = collections.namedtuple("WorkerLogging", "handler lvl")
+_WORKER = None
+
+def init_worker_logging(queue, lvl=logging.INFO, capacity=WORKER_LOG_BATCH_SIZE):
+
+    """Pool initializer setting up worker process so job loggers forward their 
+       records in batches to the shared log writer of the parent process
+
+    :param queue:    Queue of parent's shared log writer, see MultiLogger.worker_init.
+    :type  queue:    multiprocessing.Queue
+    :param lvl:      Log level of job loggers.
+    :type  lvl:      int
+    :param capacity: Number of records buffered before sending them. 
+    :type  capacity: int
+    """
+
+    global _WORKER
+    _WORKER = _WorkerLogging(BatchingQueueHandler(queue, capacity), lvl)
+
+    # Note: Runs before queue is closed at worker exit 
+    multiprocessing.util.Finalize(None, flush_worker_logging, exitpriority=100)
+
+def get_worker_logger(name):
+
+    # Parent process, or worker without init_worker_logging, uses logger as is 
+    logger = logging.getLogger(name)
+    if _WORKER is None or getattr(logger, '_is_worker', False): return logger
+
+    # Note: Replaces handlers inherited when forking 
+    logger = BaseLogger.getLogger(name, lvl=_WORKER.lvl, is_ignore=True)
+    logger.handlers = [_WORKER.handler]
+    logger._is_worker = True
+
+    return logger
+
+def flush_worker_logging():
+    if not _WORKER is None: _WORKER.handler.flush()
+
+
 # Last In First Out (LIFO), or First In Last Out (FILO) 
 # list handler for storing logging messages
 class LIFOHandler(logging.Handler):
@@ -154,30 +349,41 @@ class BufferedLogger(BaseLogger):
 
 class MultiLogger:
 
-    def __init__(self, dpath, back_dpath, is_refresh, is_backlog, log_lvl=logging.INFO):
+    def __init__(self, dpath, back_dpath, is_refresh, is_backlog, log_lvl=logging.INFO, max_open=SHARED_MAX_OPEN_FILES):
 
         self._dpath = dpath
         self._handler = None
         self._logs = {}
         self._log_lvl = log_lvl
 
+        # Writer for shared loggers, created with first shared logger 
+        self._writer = None
+        self._max_open = max_open
+
         self._dpath = dpath
         self._back_dpath = back_dpath
 
         self._is_refresh = is_refresh
         self._is_backlog = is_backlog
+        self._is_continue = False
         self._logger = None
 
+        # Background thread backing up and/or deleting old logs 
+        self._backup = None
+
 
     @property
     def logger(self): return self._logger
 
+    @property
+    def is_continue(self): return self._is_continue
+
     def get(name):
         if not name in self._logs: 
             self._logger.error("Can not get logger with name '%' as it has not been created!" % name)
         return self._logs[name]
     
-    def new(self, name, fpath, parent_logger, lvl=None, is_ignore=False, fmt=None):
+    def new(self, name, fpath, parent_logger, lvl=None, is_ignore=False, fmt=None, is_shared=False):
 
         if fmt is None: fmt = MULTI_LOGGER_FORMAT
         if lvl is None: lvl = self._log_lvl
@@ -197,7 +403,11 @@ class MultiLogger:
         if name in self._logs: parent_logger.critical("Logger with name '%s' has already been created!" % name)
 
         parent_logger.debug("Creating logger '%s' at path '%s'." % (name, fpath))
-        logger = FileLogger.getLogger(name, fpath, lvl=lvl, fmt=fmt, is_ignore=is_ignore)
+        if is_shared and not is_first:
+            if self._writer is None: self._writer = SharedLogWriter(self._max_open)
+            logger = SharedFileLogger.getLogger(name, fpath, self._writer, lvl=lvl, fmt=fmt, is_ignore=is_ignore)
+        else:
+            logger = FileLogger.getLogger(name, fpath, lvl=lvl, fmt=fmt, is_ignore=is_ignore)
 
         self._logs[name] = logger
 
@@ -213,6 +423,21 @@ class MultiLogger:
 
         return logger
 
+    def close(self):
+        # Writes out remaining records of shared loggers 
+        if not self._writer is None: self._writer.close()
+        self._writer = None
+        self.wait_backup()
+
+    def wait_backup(self):
+        # Blocks until old logs are backed up, see __init_directory
+        if not self._backup is None: self._backup.join()
+
+    def worker_init(self):
+        # Pool initializer and its arguments for forwarding job logs from workers 
+        if self._writer is None: return None, ()
+        return init_worker_logging, (self._writer.queue, self._log_lvl)
+
 
     def __init_directory(self, parent_logger):
 
@@ -227,39 +452,103 @@ class MultiLogger:
             return True
 
         if not self._is_refresh: 
+            # Note: Logs are appended to, buffered logs still need flushing 
             logger.info("Continuing from previous run.")
-            ###########################################################
-            raise NotImplementedError("CONTINUE MODE NOTE IMPLEMENTED")
-            ###########################################################
-            return False
+            self._is_continue = True
+            return True
 
         logger.info ("Starting in refresh mode")
 
         if not self._is_backlog:
             logger.warning("Backup mode turned off manually, old logs will be lost.")
+            arc_fpath = None
         else:
+            ext = ".tar.zst" if not zstandard is None else ".tar.gz"
+            arc_fpath = unique_fpath(self._back_dpath, datetime.now().strftime("%Y%m%d%H%M%S"), ext)
+
+        # Note: Moving old logs aside is atomic, so new logs can be written while 
+        #       old ones are compressed and/or deleted in the background  
+        old_dpath = unique_fpath(self._back_dpath, "old_logs", "")
+        os.rename(dpath, old_dpath)
+        os.mkdir(dpath) 
 
-            logger.info("Backing up previous logs...")
+        def backup():
+            try:
+                if not arc_fpath is None: archive_dir(old_dpath, arc_fpath, os.path.basename(dpath))
+                shutil.rmtree(old_dpath)
+            except Exception as e:
+                self.__backup_logger(logger).warning("Failed to back up/delete old logs at '%s': %s" % (old_dpath, e))
+                return
 
-            arc_fname = datetime.now().strftime("%Y%m%d%H%M.tar.gz")
+            if not arc_fpath is None:
+                self.__backup_logger(logger).info("Previous logs backed up to '%s'." % arc_fpath) 
 
-            arc_fpath = os.path.join(self._back_dpath, arc_fname)
+        # Note: Not a daemon so interpreter waits for backup to finish at exit 
+        self._backup = threading.Thread(target=backup, name="LogBackup")
+        self._backup.start()
 
-            if os.path.isfile(arc_fpath):
-                raise logger.critical("EXISITING ARCHIVE FILE PATH RESOLUTION NOT IMPLEMENTED.", NotImplementedError)
+        if arc_fpath is None:
+            logger.info("Old logs moved aside and are being deleted in the background.")
+        else:
+            logger.info("Old logs moved aside and are being backed up to '%s' in the background." % arc_fpath)
 
+        return True
 
-            with tarfile.open(arc_fpath, "w:gz") as tar:
-                tar.add(dpath, arcname=os.path.basename(dpath))
+    def __backup_logger(self, parent_logger):
+        # First logger created, i.e., the batch logger, once it exists 
+        return next(iter(self._logs.values()), parent_logger)
 
-            logger.info("Previous logs back up to '%s'." % arc_fpath) 
 
-        logger.info("Deleting old logs...")
-        shutil.rmtree(dpath)
-        os.mkdir(dpath) 
-        logger.info("Old logs deleted")
+def unique_fpath(dpath, name, ext):
+    
+    """Path in directory not already taken, a counter is appended to name if needed 
 
-        return True
+    :param dpath: Path to directory.
+    :type  dpath: str
+    :param name:  Base name of file or directory.
+    :type  name:  str
+    :param ext:   Extension appended after counter, e.g., '.tar.gz'.
+    :type  ext:   str
+
+    :rtype: str
+    """
+
+    fpath = os.path.join(dpath, name + ext)
+    i = 1
+    while os.path.exists(fpath) or os.path.exists(fpath + ".part"):
+        fpath = os.path.join(dpath, "%s_%d%s" % (name, i, ext))
+        i += 1
+
+    return fpath
+
+def archive_dir(dpath, arc_fpath, arcname):
+
+    """Archives directory as zstd compressed tar if zstandard is installed, gzip otherwise 
+
+    Archive is written to a '.part' file first and renamed once complete. 
+
+    :param dpath:     Path to directory to archive.
+    :type  dpath:     str
+    :param arc_fpath: Path to archive file.
+    :type  arc_fpath: str
+    :param arcname:   Name of directory in archive.
+    :type  arcname:   str
+    """
+
+    part_fpath = arc_fpath + ".part"
+
+    if arc_fpath.endswith(".zst"):
+        # Note: Multithreaded compression of tar stream 
+        cctx = zstandard.ZstdCompressor(threads=-1)
+        with open(part_fpath, 'wb') as f:
+            with cctx.stream_writer(f, closefd=False) as z:
+                with tarfile.open(fileobj=z, mode="w|") as tar:
+                    tar.add(dpath, arcname=arcname)
+    else:
+        with tarfile.open(part_fpath, "w:gz", compresslevel=BACKUP_GZIP_LEVEL) as tar:
+            tar.add(dpath, arcname=arcname)
+
+    os.rename(part_fpath, arc_fpath)
 
 # Code modified from Mad Physicist @ stackoverflow
 # link: https://stackoverflow.com/questions/2183233/how-to-add-a-custom-loglevel-to-pythons-logging-facility
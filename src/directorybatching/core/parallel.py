@@ -20,8 +20,9 @@
 
 from multiprocessing import Pool
 from tqdm import tqdm
+import threading
 
-def _simple(func_list, n_procs, p_bar=None, callback=None):
+def _simple(func_list, n_procs, p_bar=None, callback=None, initializer=None, initargs=()):
 
     """Internal function for executing jobs in embarrassingly parallel mode or serial mode
 
@@ -34,6 +35,10 @@ def _simple(func_list, n_procs, p_bar=None, callback=None):
     :type  args_list: tuple list
     :param p_bar:     tqdm progress bar object.
     :type  p_bar:     tqdm.std.tqdm
+    :param initializer: Function called by each worker process when it starts. 
+    :type  initializer: function or None
+    :param initargs:    Arguments of initializer function.
+    :type  initargs:    tuple
 
     :rtype: tuple list or None list
     """
@@ -50,10 +55,13 @@ def _simple(func_list, n_procs, p_bar=None, callback=None):
             
     if n_procs > 1:        
         # Executing parallel jobs
-        with Pool(n_procs) as pool:
+        with Pool(n_procs, initializer, initargs) as pool:
             jobs = [pool.apply_async(func, args=(), callback=update_progress_bar) for func in func_list]     
             # Collecting job results
             results = [(job.get()) for job in jobs]     
+            # Note: Letting workers exit normally so their queues, e.g., logs, are flushed 
+            pool.close()
+            pool.join()
     else:
         # Executing jobs in serial mode if only one processor is specified     
         results = []
@@ -65,6 +73,220 @@ def _simple(func_list, n_procs, p_bar=None, callback=None):
             
     return results 
     
+def _call(item):
+    # Top-level (picklable) wrapper for pool.imap_unordered, returns index 
+    # of function with its result so caller can match up completed jobs
+    i, func = item
+    return i, func()
+
+def _throttle(items, window, is_stopped):
+
+    """Internal generator limiting the number of items handed to the pool
+
+    :param items:      Iterable of items to hand to the pool.
+    :type  items:      iterable
+    :param window:     Semaphore released by the consumer for each received result.
+    :type  window:     threading.Semaphore
+    :param is_stopped: Event set by consumer to stop feeding items on early exit. 
+    :type  is_stopped: threading.Event
+    """
+
+    for item in items:
+        window.acquire()
+        if is_stopped.is_set(): return
+        yield item
+
+def _imap(pool, func, items, chunksize=1, max_inflight=None):
+
+    """Internal generator wrapping pool.imap_unordered with a bounded number of 
+       submitted but not yet collected items
+
+    :param pool:         Pool of worker processes. 
+    :type  pool:         multiprocessing.pool.Pool
+    :param func:         Top-level (picklable) function applied to each item.
+    :type  func:         function
+    :param items:        Iterable of items, read lazily by the pool.
+    :type  items:        iterable
+    :param chunksize:    Number of items sent to a worker at once. 
+    :type  chunksize:    int
+    :param max_inflight: Maximum number of items submitted but not yet collected.
+                         Defaults to no limit.
+    :type  max_inflight: int or None
+
+    :rtype: generator of results in order of completion
+    """
+
+    if max_inflight is None:
+        yield from pool.imap_unordered(func, items, chunksize)
+        return
+
+    # Note: Window must fit at least one chunk or pool will never receive a full task 
+    window = threading.Semaphore(max(max_inflight, chunksize, 1))
+    is_stopped = threading.Event()
+    items = _throttle(items, window, is_stopped)
+
+    try:
+        for result in pool.imap_unordered(func, items, chunksize):
+            window.release()
+            yield result
+    finally:
+        # Unblocking task feeder so pool can shutdown if consumer stops early
+        is_stopped.set()
+        window.release()
+
+def _stream(func_list, n_procs, chunksize=1, max_inflight=None, p_bar=None, callback=None, initializer=None, initargs=()):
+
+    """Internal generator for executing jobs in embarrassingly parallel mode or serial mode 
+       yielding results as they complete
+
+    :param func_list:    List of functions to be executed.
+    :type  func_list:    function list
+    :param n_procs:      Number of processes to run in parallel. Setting to 1 run function in 
+                         serial mode without multiprocessing module.   
+    :type  n_procs:      int
+    :param chunksize:    Number of functions sent to a worker at once. 
+    :type  chunksize:    int
+    :param max_inflight: Maximum number of functions submitted but not yet collected.
+                         Defaults to no limit.
+    :type  max_inflight: int or None
+    :param p_bar:        tqdm progress bar object.
+    :type  p_bar:        tqdm.std.tqdm
+    :param initializer:  Function called by each worker process when it starts. 
+    :type  initializer:  function or None
+    :param initargs:     Arguments of initializer function.
+    :type  initargs:     tuple
+
+    :rtype: generator of (index, result) tuples in order of completion
+    """
+
+    def update_progress_bar(result):
+        if not callback is None: callback(result)
+        if not p_bar is None: p_bar.update()
+
+    if n_procs > 1:
+        with Pool(n_procs, initializer, initargs) as pool:
+            for i, result in _imap(pool, _call, enumerate(func_list), chunksize, max_inflight):
+                update_progress_bar(result)
+                yield i, result
+            # Note: Letting workers exit normally so their queues, e.g., logs, are flushed 
+            pool.close()
+            pool.join()
+    else:
+        # Executing jobs in serial mode if only one processor is specified     
+        for i, func in enumerate(func_list):
+            result = func()
+            update_progress_bar(result)
+            yield i, result
+
+# Objects resident in worker process keyed by some ID, see Executor
+_RESIDENT = {}
+
+def _init_resident(objs, initializer=None, initargs=()):
+    global _RESIDENT
+    _RESIDENT = objs
+    if not initializer is None: initializer(*initargs)
+
+def _call_resident(item): return _call_method(_RESIDENT, item)
+
+def _call_method(objs, item):
+    # Calls method of object after updating its dictionary attributes, 
+    # e.g., {'_params': {...}}, returns index of task with its result 
+    i, (key, meth_name, updates) = item
+    obj = objs[key]
+    if not updates is None:
+        for name, vals in updates.items(): getattr(obj, name).update(vals)
+    return i, getattr(obj, meth_name)()
+
+class Executor:
+
+    """Long-lived pool of worker processes with objects, e.g., jobs, resident in each worker
+
+    Objects are handed to the workers once when the pool is created (inherited when 
+    forking, pickled once per worker otherwise) so tasks only send the object key, 
+    the method name and small updates to the object's dictionary attributes.
+    """
+
+    def __init__(self, objs, n_procs, chunksize=1, max_inflight=None, initializer=None, initargs=()):
+
+        """
+        :param objs:         Dictionary of objects keyed by ID.
+        :type  objs:         dict
+        :param n_procs:      Number of processes to run in parallel. Setting to 1 run methods in 
+                             serial mode without multiprocessing module.   
+        :type  n_procs:      int
+        :param chunksize:    Number of tasks sent to a worker at once. 
+        :type  chunksize:    int
+        :param max_inflight: Maximum number of tasks submitted but not yet collected.
+        :type  max_inflight: int or None
+        :param initializer:  Function called by each worker process when it starts. 
+        :type  initializer:  function or None
+        :param initargs:     Arguments of initializer function.
+        :type  initargs:     tuple
+        """
+
+        self._objs = objs
+        self._n_procs = n_procs
+        self._chunksize = chunksize
+        self._max_inflight = max_inflight
+
+        if n_procs > 1:
+            self._pool = Pool(n_procs, initializer=_init_resident, initargs=(objs, initializer, initargs))
+        else:
+            self._pool = None
+
+    def __enter__(self): return self
+
+    def __exit__(self, *dummy): self.close()
+
+    def close(self):
+        if self._pool is None: return
+        self._pool.close()
+        self._pool.join()
+        self._pool = None
+
+    def _stream(self, tasks, p_bar=None, callback=None):
+
+        def update_progress_bar(result):
+            if not callback is None: callback(result)
+            if not p_bar is None: p_bar.update()
+
+        items = enumerate(tasks)
+
+        if self._pool is None:
+            # Executing in serial mode with objects in current process
+            results = (_call_method(self._objs, item) for item in items)
+        else:
+            results = _imap(self._pool, _call_resident, items, self._chunksize, self._max_inflight)
+
+        for i, result in results:
+            update_progress_bar(result)
+            yield i, result
+
+    def stream(self, tasks, total=None, p_desc=None, is_p_bar=True, callback=None):
+
+        """Executes tasks on the pool yielding results as they complete 
+
+        :param tasks:    Iterable of (key, method name, updates) tuples where updates is 
+                         None or a dictionary of dictionary attributes to update on the 
+                         object before calling the method.  
+        :type  tasks:    iterable
+        :param total:    Number of tasks for progress bar. 
+        :type  total:    int or None
+
+        :rtype: generator of (index, result) tuples in order of completion
+        """
+
+        if is_p_bar:
+            if p_desc is None: p_desc = 'Jobs'
+            p_bar = tqdm(total=total, desc=p_desc)
+        else:
+            p_bar = None
+
+        try:
+            yield from self._stream(tasks, p_bar, callback)
+        finally:
+            if is_p_bar: p_bar.close()
+
 def _zip_args(args_list, common_args):
 
     """ Internal function for generating list of tuples from arguments for each parallel job
@@ -91,7 +313,7 @@ def _zip_args(args_list, common_args):
             
     return full_args_list
 
-def simple(func_list, n_procs, p_desc=None, is_p_bar=True, callback=None):
+def simple(func_list, n_procs, p_desc=None, is_p_bar=True, callback=None, initializer=None, initargs=()):
 
     # Creating tqdm progress bar  
     if is_p_bar:
@@ -104,7 +326,7 @@ def simple(func_list, n_procs, p_desc=None, is_p_bar=True, callback=None):
     # locking up if an exception is thrown by the function
     try:
         #args_list = _zip_args(args_list, common_args)
-        results = _simple(func_list, n_procs, p_bar, callback)
+        results = _simple(func_list, n_procs, p_bar, callback, initializer, initargs)
     except Exception as e:
         # Cleaning up progress bar on error to avoid I/O issues
         if is_p_bar: p_bar.close()
@@ -115,3 +337,19 @@ def simple(func_list, n_procs, p_desc=None, is_p_bar=True, callback=None):
 
     return results
 
+def stream(func_list, n_procs, p_desc=None, is_p_bar=True, callback=None, chunksize=1, max_inflight=None, 
+           initializer=None, initargs=()):
+
+    # Creating tqdm progress bar  
+    if is_p_bar:
+        if p_desc is None: p_desc = 'Jobs'
+        p_bar = tqdm(total=len(func_list), desc=p_desc)
+    else:
+        p_bar = None
+
+    # Note: Progress bar is cleaned up on error or when consumer stops early 
+    #       to avoid I/O issues, generator exit shuts down parallel pool 
+    try:
+        yield from _stream(func_list, n_procs, chunksize, max_inflight, p_bar, callback, initializer, initargs)
+    finally:
+        if is_p_bar: p_bar.close()
@@ -1,4 +1,66 @@
-
+import re
+import types
+import hashlib
+import numpy as np
+
+# Regex of integer strings converted in bulk with NumPy, number of digits is 
+# limited so values fit in int64 and convert to float the same as int 
+INT_PATTERN = r'[+-]?[0-9]{1,15}'
+
+def _rint_keys(values):
+    if not np.all(np.isfinite(values)):
+        raise ValueError("Non-finite values can not be converted to integer keys.")
+    return np.rint(values).astype(np.int64)
+
+
+def parser_config(parser):
+    """Digest of parser settings, e.g., delimiters, digits and functions with 
+       the values they capture, same for parsers constructed the same way
+
+    :param parser: Parser of directory map.
+    :type  parser: ValidatorParser
+
+    :rtype: str
+    """
+    string = repr(_describe(parser, set()))
+    return hashlib.blake2b(string.encode('utf-8'), digest_size=16).hexdigest()
+
+# Attributes of parsers that are caches and not settings
+_CACHE_ATTRS = {'_regexes'}
+
+def _describe(obj, active):
+
+    if obj is None or type(obj) in (bool, int, float, str, bytes): return obj
+    if isinstance(obj, np.generic): return obj.item()
+    if isinstance(obj, (list, tuple)): return tuple(_describe(v, active) for v in obj)
+    if isinstance(obj, dict): 
+        return tuple(sorted(((str(k), _describe(v, active)) for k, v in obj.items()), key=lambda x: x[0]))
+    if isinstance(obj, re.Pattern): return ('re', obj.pattern, obj.flags)
+    if isinstance(obj, types.MethodType): return _describe(obj.__func__, active)
+    if isinstance(obj, types.CodeType): return ('code', obj.co_code, _describe(obj.co_consts, active))
+
+    # Note: Settings of lambdas are the values captured in their closure
+    if isinstance(obj, types.FunctionType):
+        cells = []
+        for cell in obj.__closure__ or ():
+            try:
+                cells.append(cell.cell_contents)
+            except ValueError:
+                cells.append(None)
+        return ('function', obj.__module__, obj.__qualname__, _describe(obj.__code__, active),
+                _describe(obj.__defaults__, active), _describe(cells, active))
+
+    name = "%s.%s" % (type(obj).__module__, type(obj).__qualname__)
+    attrs = getattr(obj, '__dict__', None)
+    if isinstance(obj, type) or attrs is None: 
+        return ('object', name, getattr(obj, '__qualname__', repr(obj)))
+
+    # Note: Only objects being described are tracked, shared ones are described each time  
+    if id(obj) in active: return ('cycle', name)
+    active.add(id(obj))
+    rtnval = ('object', name, _describe({k: v for k, v in attrs.items() if not k in _CACHE_ATTRS}, active))
+    active.remove(id(obj))
+    return rtnval
 
 
 class Invertable:
@@ -28,6 +90,15 @@ class NameValidator(Invertable):
         if not type(rtn_val) is tuple: rtn_val = (rtn_val, string)
         return rtn_val
         
+    def forward_many(self, name, strings):
+        rtnvals = [self.forward(name, s) for s in strings]
+        mask = np.array([r[0] for r in rtnvals], dtype=bool)
+        return mask, [r[1] for r in rtnvals]
+
+    # Regex matching strings that forward accepts with value matching 'frag' in 
+    # group 'v', None if not expressible as regex 
+    def pattern(self, name, frag): return None
+
     def test(self, name, string, is_allow_none=True):
 
         string = self._forward(name, string)
@@ -58,11 +129,20 @@ class StartsWith(NameValidator):
     def __reverse(cls, name, end_string):
         return "%s%s" % (name, end_string)
 
+    def pattern(self, name, frag):
+        return "%s(?P<v>%s)" % (re.escape(name), frag)
+
+def _is_safe_delimiter(delimiter, name):
+    # Note: Delimiter can not be part of name or of integer values
+    return len(delimiter) > 0 and not delimiter in name and \
+           not any(c in '+-0123456789' for c in delimiter)
+
 class MatchAt(NameValidator):
 
     def __init__(self, index, delimiter='_'):
 
         self._del = delimiter
+        self._is_first = index == 0 or index == 'first'
 
         if index == 0 or index == 'first':
            super().__init__(self.__first_forward, self.__first_reverse)
@@ -96,11 +176,18 @@ class MatchAt(NameValidator):
     def __last_reverse(self, name, string):
         return string + self._del + name
 
+    def pattern(self, name, frag):
+        if not _is_safe_delimiter(self._del, name): return None
+        d = re.escape(self._del)
+        if self._is_first: return "%s%s(?P<v>%s)" % (re.escape(name), d, frag)
+        return "(?P<v>%s)%s%s" % (frag, d, re.escape(name))
+
 class SplitAt(NameValidator):
 
     def __init__(self, index, delimiter='_'):
 
         self._del = delimiter
+        self._is_first = index == 0 or index == 'first'
 
         if index == 0 or index == 'first':
            super().__init__(self.__first_forward, self.__first_reverse)
@@ -134,10 +221,28 @@ class SplitAt(NameValidator):
     def __last_reverse(self, name, string):
         return string + self._del + name
 
+    def forward_many(self, name, strings):
+        if self._is_first:
+            parts = [s.partition(self._del) for s in strings]
+        else:
+            parts = [s.rpartition(self._del) for s in strings]
+        firsts = [p[0] for p in parts]
+        lasts  = [p[2] for p in parts]
+        return np.ones(len(strings), dtype=bool), (firsts, lasts)
+
+    # Regex of string split at last delimiter, string before it matching 'inner'
+    # and string after it in group 'p'
+    def split_pattern(self, inner):
+        if self._is_first or not _is_safe_delimiter(self._del, ''): return None
+        d = re.escape(self._del)
+        rest = "[^%s]*" % d if len(self._del) == 1 else "(?:(?!%s).)*" % d
+        return "(?:%s)%s(?P<p>%s)" % (inner, d, rest)
+
 
 class ValueParser(Invertable):
 
-    def __init__(self, forward, reverse, dtype, is_simple=True):
+    def __init__(self, forward, reverse, dtype, is_simple=True, pattern=None, vforward=None,
+                 to_key=None, to_keys=None, from_key=None):
 
         if is_simple:
             fp = lambda n, x: {n : forward(x)}
@@ -147,13 +252,32 @@ class ValueParser(Invertable):
 
         super().__init__(fp, rp)
         self._dtype = dtype
+        # Regex of strings that vforward converts, as a list, the same as forward 
+        self._pattern = pattern 
+        self._vforward = vforward if is_simple else None
+        # Exact keys for matching values, e.g., fixed-point integers of decimals, 
+        # values are their own keys by default
+        self._to_key   = (lambda x: x) if to_key is None else to_key
+        self._to_keys  = np.asarray if to_keys is None else to_keys
+        self._from_key = (lambda k: k) if from_key is None else from_key
 
     @property
     def dtype(self): return self._dtype
 
+    @property
+    def pattern(self): return self._pattern
+
+    def to_key(self, value): return self._to_key(value)
+    def to_keys(self, values): return self._to_keys(values)
+    def from_key(self, key): return self._from_key(key)
+
+    def forward_many(self, name, strings):
+        if self._vforward is None: return [self.forward(name, x) for x in strings]
+        return [{name: v} for v in self._vforward(strings)]
+
     @classmethod
     def get_dummy(cls, dtype=str):
-        return ValueParser(lambda x: x, lambda x: x, dtype)
+        return ValueParser(lambda x: x, lambda x: x, dtype, pattern='.*', vforward=list)
 
 
 class ValidatorParser(Invertable):
@@ -163,6 +287,7 @@ class ValidatorParser(Invertable):
         self._parser = parser
         self._preproc = preprocessor
         self._has_preproc = not preprocessor is None
+        self._regexes = {}
 
     def raw_forward(self, value):
         k = 'dummy'
@@ -173,6 +298,18 @@ class ValidatorParser(Invertable):
         test = self._parser.reverse(k, {k: value})
         return test
 
+    def to_key(self, value): 
+        """Exact key of parsed value for matching, e.g., 0.32 => 32"""
+        return self._parser.to_key(value)
+
+    def to_keys(self, values): 
+        """Exact keys of array/column of parsed values"""
+        return self._parser.to_keys(values)
+
+    def from_key(self, key): 
+        """Parsed value of key, same as parsing its directory name"""
+        return self._parser.from_key(key)
+
     @property 
     def dtype(self): return self._parser.dtype
 
@@ -193,6 +330,56 @@ class ValidatorParser(Invertable):
 
         return rtnval
 
+    def forward_many(self, name, strings):
+        """Parses list of sibling directory names, same as forward for each name
+
+        Names matching the regex compiled from the preprocessor, validator and 
+        parser are converted in bulk, all others are parsed one by one by forward.
+
+        :param name:    Directory map name.
+        :type  name:    str
+        :param strings: Directory names.
+        :type  strings: str list
+
+        :rtype: list of parsed dicts or None for invalid names
+        """
+
+        strings = list(strings)
+        regex = self.__get_regex(name)
+        if regex is None or any('\n' in s for s in strings): 
+            return [self.forward(name, s) for s in strings]
+
+        matches = [regex.fullmatch(s) for s in strings]
+        idx = [i for i, m in enumerate(matches) if not m is None]
+
+        rtnvals = self._parser.forward_many(name, [matches[i].group('v') for i in idx])
+        if self._has_preproc:
+            pstrings = [matches[i].group('p') for i in idx]
+            prtnvals = self._preproc.parser.forward_many(self._preproc.name, pstrings)
+            for rtnval, prtnval in zip(rtnvals, prtnvals): rtnval['virtual'] = prtnval
+
+        results = [None]*len(strings)
+        for i, rtnval in zip(idx, rtnvals): results[i] = rtnval
+
+        # Note: Names not matching may still be valid or raise as in forward 
+        for i, m in enumerate(matches):
+            if m is None: results[i] = self.forward(name, strings[i])
+
+        return results
+
+    def __get_regex(self, name):
+
+        if name in self._regexes: return self._regexes[name]
+
+        regex = None
+        frag = getattr(self._parser, 'pattern', None)
+        if not frag is None: regex = self._validator.pattern(name, frag)
+        if not regex is None and self._has_preproc: regex = self._preproc.pattern(regex)
+
+        if not regex is None: regex = re.compile(regex)
+        self._regexes[name] = regex
+        return regex
+
     def reverse(self, name, rtnval, ignore_preproc=False):
 
 
@@ -221,9 +408,17 @@ class Preprocessor(ValidatorParser):
     @property
     def name(self): return self._name
 
+    @property
+    def parser(self): return self._parser
+
     def forward(self, name,  string):
         _, (string, value) = self._validator.forward(name, string)
         return string, self._parser.forward(self._name, value)
+
+    def pattern(self, inner):
+        split_pattern = getattr(self._validator, 'split_pattern', None)
+        if split_pattern is None or not self._parser.pattern == '.*': return None
+        return split_pattern(inner)
     
     def reverse(self, string, rtnvals):
         vstring = self._parser.reverse(self._name, rtnvals)
@@ -245,7 +440,8 @@ class Integer(ValidatorParser):
     def __init__(self, validator, n=0, is_flip_sign=False, preprocessor=None):
         s = -1 if is_flip_sign else 1
         fmt = "%d" if n==0 else "%%0%dd" % n
-        parser = ValueParser(int, lambda x: fmt % (s*x), int)
+        vforward = lambda xs: np.array(xs).astype(np.int64).tolist()
+        parser = ValueParser(int, lambda x: fmt % (s*x), int, pattern=INT_PATTERN, vforward=vforward)
         super().__init__(validator, parser, preprocessor=preprocessor)
     
 class Decimal(ValidatorParser):
@@ -260,7 +456,16 @@ class Decimal(ValidatorParser):
             fmt = '%%0%dd' % (digits + 1)
             forward = lambda x: float(s*int(x)*10**-pow)
             reverse = lambda x: fmt % (s*x*10**pow)
-            parser = ValueParser(forward, reverse, float)
+            # Note: Same operations as forward in float64, integer scaling could overflow
+            vforward = lambda xs: (s*np.array(xs).astype(np.int64)*10**-pow).astype(float).tolist()
+            pattern = INT_PATTERN if pow >= 0 else None
+            # Note: Key is the integer in the directory name, rounding instead of
+            #       truncating as reverse does, e.g., 0.29*100 => 28.999999999999996
+            to_key   = lambda x: int(np.rint(s*x*10**pow))
+            to_keys  = lambda xs: _rint_keys(s*np.asarray(xs, dtype=float)*10**pow)
+            from_key = lambda k: float(s*int(k)*10**-pow)
+            parser = ValueParser(forward, reverse, float, pattern=pattern, vforward=vforward,
+                                 to_key=to_key, to_keys=to_keys, from_key=from_key)
  
         super().__init__(validator, parser, preprocessor=preprocessor)
 
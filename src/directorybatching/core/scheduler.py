@@ -0,0 +1,293 @@
+import os
+import re
+import subprocess
+from abc import ABC, abstractmethod
+
+# Scheduler output file names, e.g., PBS 'name.o1234'/'name.e1234' and
+# Slurm 'slurm-1234.out'/'slurm-1234_5.out' (array task)
+PBS_FNAME_RE   = re.compile(r'^.+\.([oe])(\d+)(?:\.\d+)?$')
+SLURM_FNAME_RE = re.compile(r'^slurm-(\d+)(?:_\d+)?\.(out|err)$')
+
+def parse_output_fname(fname):
+    """Scheduler job id and stream of an output file name
+
+    :param fname: File name without directory.
+    :type  fname: str
+
+    :rtype: (int, str) tuple of job id and 'o' or 'e', or None if not an output file
+    """
+
+    m = PBS_FNAME_RE.match(fname)
+    if not m is None: return int(m.group(2)), m.group(1)
+
+    m = SLURM_FNAME_RE.match(fname)
+    if not m is None: return int(m.group(1)), 'o' if m.group(2) == 'out' else 'e'
+
+    return None
+
+def get_dir_jobid(dpath, delimiter='_'):
+    """Scheduler job id from suffix of job directory name, e.g., 'cd010_1234' => 1234
+
+    :rtype: int or None if no job id suffix
+    """
+    _, is_sep, suffix = os.path.basename(os.path.normpath(dpath)).rpartition(delimiter)
+    return int(suffix) if is_sep and suffix.isdigit() else None
+
+class SchedulerIndex:
+
+    """Index of PBS/Slurm output files built once for all jobs
+
+    Output files are found in job directories, as written by default when
+    submitting from the job directory, and in shared output directories where
+    they are matched to jobs by the job id suffix of the job directory name,
+    e.g., 'cd010_1234' => 1234.
+    """
+
+    def __init__(self, job_dpaths, hpc_dpaths=None, delimiter='_'):
+        self._delimiter = delimiter
+        self._by_dpath = {}
+        self._by_jobid = {}
+
+        for dpath in job_dpaths:
+            fpaths = self.__scan(dpath)
+            if len(fpaths) > 0: self._by_dpath[dpath] = fpaths
+
+        for dpath in ([] if hpc_dpaths is None else hpc_dpaths):
+            for item in self.__scan(dpath):
+                self._by_jobid.setdefault(item[0], []).append(item)
+
+    def __len__(self):
+        return sum(len(v) for v in self._by_dpath.values()) + \
+               sum(len(v) for v in self._by_jobid.values())
+
+    def get(self, dpath):
+        """Output files of job directory, newest job first and error before output file
+
+        :param dpath: Path to job directory.
+        :type  dpath: str
+
+        :rtype: str list
+        """
+
+        items = list(self._by_dpath.get(dpath, []))
+
+        jobid = self.get_jobid(dpath)
+        if not jobid is None: items.extend(self._by_jobid.get(jobid, []))
+
+        # Note: Resubmitted jobs leave older output files behind
+        items.sort(key=lambda x: (-x[0], x[1], x[2]))
+        return [fpath for _, _, fpath in items]
+
+    def get_jobid(self, dpath):
+        return get_dir_jobid(dpath, self._delimiter)
+
+    def __scan(self, dpath):
+
+        items = []
+        try:
+            with os.scandir(dpath) as it:
+                for entry in it:
+                    rtnval = parse_output_fname(entry.name)
+                    if rtnval is None or not entry.is_file(): continue
+                    jobid, stream = rtnval
+                    items.append((jobid, stream, entry.path))
+        except OSError:
+            pass
+
+        return items
+
+
+##############################
+# Scheduler queue snapshots  #
+##############################
+
+QUEUED  = 'QUEUED'
+RUNNING = 'RUNNING'
+
+# Scheduler states of jobs not yet finished, other states are ignored
+PBS_STATES   = {'Q': QUEUED, 'H': QUEUED, 'W': QUEUED, 'T': QUEUED, 'S': QUEUED,
+                'R': RUNNING, 'E': RUNNING, 'B': RUNNING}
+SLURM_STATES = {'PENDING': QUEUED, 'REQUEUED': QUEUED, 'SUSPENDED': QUEUED,
+                'RESIZING': QUEUED, 'CONFIGURING': RUNNING, 'RUNNING': RUNNING,
+                'COMPLETING': RUNNING}
+
+# Note: squeue output is expected as 'squeue -h -o "%i %T %Z"'
+SQUEUE_CMD = ['squeue', '-h', '-o', '%i %T %Z']
+QSTAT_CMD  = ['qstat', '-f']
+
+JOBID_RE = re.compile(r'^(\d+)')
+
+def _dpath_key(dpath):
+    # Note: Schedulers report absolute working directories, job directories 
+    #       are relative to the working directory when the root path is
+    return os.path.realpath(dpath)
+
+class QueueSnapshot:
+
+    """Scheduler states of unfinished jobs by job id and working directory
+
+    :param items: Iterable of (jobid, state, workdir) with workdir None if unknown.
+    :type  items: iterable
+    """
+
+    def __init__(self, items=()):
+        self._by_jobid = {}
+        self._by_dpath = {}
+
+        # Note: Jobs without a job id are only known by working directory 
+        unnamed = set()
+
+        for jobid, state, workdir in items:
+            if not jobid is None: self._by_jobid[jobid] = state
+            if not workdir is None: self._by_dpath[_dpath_key(workdir)] = state
+            if jobid is None and not workdir is None: unnamed.add(_dpath_key(workdir))
+
+        self._n_jobs = len(self._by_jobid) + len(unnamed)
+
+    def __len__(self): return self._n_jobs
+
+    def get(self, dpath, jobid=None):
+        """State of job in directory or with job id
+
+        :rtype: QUEUED, RUNNING or None if not in queue
+        """
+        state = self._by_dpath.get(_dpath_key(dpath))
+        if state is None and not jobid is None: state = self._by_jobid.get(jobid)
+        return state
+
+class QueueProvider(ABC):
+
+    """Source of a queue snapshot, read once per batch run"""
+
+    @abstractmethod
+    def snapshot(self): pass
+
+class FileQueueProvider(QueueProvider):
+
+    """Snapshot from captured 'qstat -f' or 'squeue -h -o "%i %T %Z"' output
+
+    :param fpath: Path to captured scheduler output.
+    :type  fpath: str
+    :param fmt:   'pbs' or 'slurm', detected from contents if None.
+    :type  fmt:   str or None
+    """
+
+    def __init__(self, fpath, fmt=None):
+        self._fpath = fpath
+        self._fmt = fmt
+
+    def snapshot(self):
+        with open(self._fpath) as f: text = f.read()
+        return parse_queue(text, self._fmt)
+
+class CommandQueueProvider(QueueProvider):
+
+    """Snapshot from a single call of the scheduler command
+
+    :param fmt: 'pbs' or 'slurm'.
+    :type  fmt: str
+    """
+
+    def __init__(self, fmt):
+        if not fmt in ('pbs', 'slurm'): raise ValueError("Unknown scheduler format '%s'." % fmt)
+        self._fmt = fmt
+
+    def snapshot(self):
+        cmd = QSTAT_CMD if self._fmt == 'pbs' else SQUEUE_CMD
+        text = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+        return parse_queue(text, self._fmt)
+
+class FakeQueueProvider(QueueProvider):
+
+    """Fixed snapshot for running without a scheduler
+
+    :param states: Scheduler states by job directory (str) or job id (int).
+    :type  states: dict
+    """
+
+    def __init__(self, states):
+        self._states = states
+
+    def snapshot(self):
+        items = [(k, v, None) if type(k) is int else (None, v, k) for k, v in self._states.items()]
+        return QueueSnapshot(items)
+
+def parse_queue(text, fmt=None):
+
+    if fmt is None: fmt = 'pbs' if 'Job Id:' in text else 'slurm'
+
+    if fmt == 'pbs':   return QueueSnapshot(parse_qstat(text))
+    if fmt == 'slurm': return QueueSnapshot(parse_squeue(text))
+
+    raise ValueError("Unknown scheduler format '%s'." % fmt)
+
+def parse_qstat(text):
+    """Parses 'qstat -f' output
+
+    :rtype: list of (jobid, state, workdir) of unfinished jobs
+    """
+
+    jobs = []
+    attrs, key = None, None
+
+    for line in text.split('\n'):
+
+        if line.startswith('Job Id:'):
+            attrs, key = {'Job Id': line[7:].strip()}, None
+            jobs.append(attrs)
+            continue
+
+        if attrs is None: continue
+
+        # Note: Long values are wrapped onto lines starting with a tab
+        if line.startswith('\t') and not key is None:
+            attrs[key] += line.strip()
+            continue
+
+        name, is_sep, val = line.partition(' = ')
+        if not is_sep: continue
+        key = name.strip()
+        attrs[key] = val.strip()
+
+    items = []
+    for attrs in jobs:
+
+        state = PBS_STATES.get(attrs.get('job_state'))
+        if state is None: continue
+
+        m = JOBID_RE.match(attrs['Job Id'])
+        jobid = None if m is None else int(m.group(1))
+
+        # Note: Torque reports init_work_dir, PBS Pro only the submission environment
+        workdir = attrs.get('init_work_dir')
+        if workdir is None:
+            for var in attrs.get('Variable_List', '').split(','):
+                name, is_sep, val = var.partition('=')
+                if name == 'PBS_O_WORKDIR': workdir = val
+
+        items.append((jobid, state, workdir))
+
+    return items
+
+def parse_squeue(text):
+    """Parses 'squeue -h -o "%i %T %Z"' output
+
+    :rtype: list of (jobid, state, workdir) of unfinished jobs
+    """
+
+    items = []
+    for line in text.split('\n'):
+
+        parts = line.split(None, 2)
+        if len(parts) < 2: continue
+
+        state = SLURM_STATES.get(parts[1])
+        if state is None: continue
+
+        m = JOBID_RE.match(parts[0])
+        jobid = None if m is None else int(m.group(1))
+        workdir = parts[2].strip() if len(parts) > 2 else None
+
+        items.append((jobid, state, workdir))
+
+    return items
@@ -0,0 +1,169 @@
+import sys
+import json
+import sqlite3
+import pathlib
+import importlib
+import numpy as np
+from types import SimpleNamespace
+
+# Layout of state database, bumped when tables change
+STATE_VERSION = 1
+
+# Note: Plain SQLite tables so saved states can be read by other tools,
+#       statuses are stored by name and message instead of pickled enums
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS nodes (
+    node_id     INTEGER PRIMARY KEY,  -- pre-order index of node
+    parent_id   INTEGER,              -- NULL for root
+    name        TEXT,
+    bname       TEXT,                 -- directory map name
+    dpath       TEXT,
+    leaf_id     INTEGER,              -- NULL if not a leaf
+    is_leaf     INTEGER,
+    is_vleaf    INTEGER,
+    rtnval      TEXT,                 -- JSON of parsed values
+    status      TEXT,                 -- status name, e.g., 'VALID'
+    status_msg  TEXT,
+    status_type TEXT,                 -- 'module:qualified name' of status enum
+    status_id   INTEGER,              -- id within status enum
+    is_valid    TEXT,                 -- 'VALID', 'PARTIAL' or 'INVALID'
+    version     INTEGER               -- save in which row was last written
+);
+"""
+
+COLUMNS = ('node_id', 'parent_id', 'name', 'bname', 'dpath', 'leaf_id', 'is_leaf', 'is_vleaf',
+           'rtnval', 'status', 'status_msg', 'status_type', 'status_id', 'is_valid')
+
+def _to_json(val):
+    # Note: Parsed values may be numpy scalars, also as keys of nested dicts
+    if isinstance(val, dict): return {str(_to_json(k)): _to_json(v) for k, v in val.items()}
+    if isinstance(val, (list, tuple)): return [_to_json(v) for v in val]
+    if isinstance(val, np.generic): return val.item()
+    return val
+
+def node_row(node_id, parent_id, name, bname, dpath, leaf_id, is_leaf, is_vleaf, rtnval, status, is_valid):
+    """Converts node attributes to a row of the nodes table, see COLUMNS"""
+
+    if status is None:
+        status_cols = (None, None, None, None)
+    else:
+        stype = type(status)
+        status_cols = (status.name, status.display_string,
+                       "%s:%s" % (stype.__module__, stype.__qualname__), int(status.id))
+
+    if type(is_valid) is bool or type(is_valid) is np.bool_:
+        is_valid = 'VALID' if is_valid else 'INVALID'
+    elif not is_valid is None:
+        is_valid = is_valid.name
+
+    return (int(node_id), None if parent_id is None else int(parent_id), str(name), bname, dpath,
+            None if leaf_id is None else int(leaf_id), int(is_leaf), int(is_vleaf),
+            None if rtnval is None else json.dumps(_to_json(rtnval), default=str),
+            *status_cols, is_valid)
+
+def _resolve_status(status_type, name):
+    # Note: Status enums of scripts, e.g., __main__, are only found when run by the same script
+    try:
+        module, qualname = status_type.split(':')
+        obj = sys.modules[module] if module in sys.modules else importlib.import_module(module)
+        for attr in qualname.split('.'): obj = getattr(obj, attr)
+        return obj[name]
+    except Exception:
+        return None
+
+class TreeState:
+
+    """Versioned SQLite store of directory tree nodes and their statuses
+
+    Every save writes only rows that changed since the previous save in this run,
+    or all rows after the tree structure changed. Rows are tagged with the save
+    version in which they were last written.
+    """
+
+    def __init__(self, fpath):
+        self._fpath = fpath
+        # Rows last written in this run by node id
+        self._rows = None
+        self._version = None
+
+    @property
+    def fpath(self): return self._fpath
+
+    def save(self, rows, is_full=False):
+        """Writes node rows, see node_row
+
+        :param rows:    Rows of changed nodes, or all nodes if is_full.
+        :type  rows:    list of tuples
+        :param is_full: Rows are all nodes of tree, others are removed.
+        :type  is_full: bool
+
+        :rtype: int number of rows written
+        """
+
+        is_full = is_full or self._rows is None
+        if not is_full: rows = [r for r in rows if not self._rows.get(r[0]) == r]
+        if len(rows) == 0 and not is_full: return 0
+
+        con = sqlite3.connect(self._fpath)
+        try:
+            con.executescript(SCHEMA)
+            with con:
+                if self._version is None:
+                    self._version = self.__read_version(con)
+                self._version += 1
+
+                if is_full:
+                    con.execute("DELETE FROM nodes")
+                    self._rows = {}
+
+                sql = "INSERT OR REPLACE INTO nodes (%s, version) VALUES (%s)" % \
+                      (', '.join(COLUMNS), ', '.join(['?']*(len(COLUMNS) + 1)))
+                con.executemany(sql, [(*r, self._version) for r in rows])
+
+                meta = [('state_version', str(STATE_VERSION)), ('version', str(self._version))]
+                con.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", meta)
+        finally:
+            con.close()
+
+        for r in rows: self._rows[r[0]] = r
+        return len(rows)
+
+    @classmethod
+    def __read_version(cls, con):
+        row = con.execute("SELECT value FROM meta WHERE key='version'").fetchone()
+        return 0 if row is None else int(row[0])
+
+    @classmethod
+    def load(cls, fpath):
+        """Reads saved leafs without rebuilding the tree
+
+        :param fpath: Path to state database.
+        :type  fpath: str
+
+        :rtype: SimpleNamespace with version and leafs, leafs have the attributes
+                of COLUMNS with status as enum or None if its type is not found
+        """
+
+        # Note: Path is quoted in the URI, e.g., '?' or '#' in directory names
+        con = sqlite3.connect(pathlib.Path(fpath).resolve().as_uri() + "?mode=ro", uri=True)
+        try:
+            meta = dict(con.execute("SELECT key, value FROM meta").fetchall())
+            if not int(meta.get('state_version', -1)) == STATE_VERSION:
+                raise ValueError("Unsupported state version '%s'." % meta.get('state_version'))
+
+            rows = con.execute("SELECT %s FROM nodes WHERE is_leaf=1 ORDER BY node_id" % ', '.join(COLUMNS)).fetchall()
+        finally:
+            con.close()
+
+        leafs = []
+        for row in rows:
+            leaf = SimpleNamespace(**dict(zip(COLUMNS, row)))
+            leaf.rtnval = None if leaf.rtnval is None else json.loads(leaf.rtnval)
+            leaf.status = None if leaf.status is None else _resolve_status(leaf.status_type, leaf.status)
+            leafs.append(leaf)
+
+        return SimpleNamespace(version=int(meta['version']), leafs=leafs)
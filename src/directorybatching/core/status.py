@@ -45,54 +45,148 @@ class Base(Enum, metaclass=ABCEnumMeta):
     @classmethod
     def get_by_id(cls, id):
 
-        fs = [s for s in cls if s.id == id]
-        if len(fs) == 1: return fs[0]
+        table = _get_table(cls)
+        i = id - table.id_min
+        if 0 <= i < len(table.members):
+            s = table.members[i]
+            if s is _DUPLICATE: raise ValueError("More than one enum with same ID in '%s'" % cls)
+            if not s is None: return s
 
-        if len(fs) > 1: raise ValueError("More than one enum with same ID in '%s'" % cls)
-        raise ValueError("ID %d is not in Enum '%s'." (id, cls))
+        raise ValueError("ID %d is not in Enum '%s'." % (id, cls))
+
+    @classmethod
+    def get_by_ids(cls, ids):
+        """Vectorized get_by_id, returns an object array of enums.
+        :param ids: Array like of integer enum IDs
+        """
+        table = _get_table(cls)
+        return table.members[_check_ids(cls, table, ids)]
 
     @classmethod
     def all_valid(cls, statuses): 
-        return np.all([s.is_valid for s in statuses])
+        return all(s.is_valid for s in statuses)
 
     @classmethod
     def any_valid(cls, statuses):
-        return np.any([s.is_valid for s in statuses])
-
+        return any(s.is_valid for s in statuses)
 
     @classmethod
     def max(cls, statuses):
-        max_id = np.max([s.id for s in statuses])
-        return cls.get_by_id(max_id)
+        return cls.get_by_id(max(s.id for s in statuses))
 
     @classmethod
     def min(cls, statuses):
-        min_id = np.min([s.id for s in statuses])
-        return cls.get_by_id(min_id)
+        return cls.get_by_id(min(s.id for s in statuses))
+
+    @classmethod
+    def all_valid_ids(cls, ids):
+        table = _get_table(cls)
+        return bool(np.all(table.is_valid[_check_ids(cls, table, ids)]))
+
+    @classmethod
+    def any_valid_ids(cls, ids):
+        table = _get_table(cls)
+        return bool(np.any(table.is_valid[_check_ids(cls, table, ids)]))
+
+    @classmethod
+    def max_id(cls, ids): return cls.get_by_id(int(np.max(ids)))
+
+    @classmethod
+    def min_id(cls, ids): return cls.get_by_id(int(np.min(ids)))
+
+
+# Lookup tables built once per enum class, members are indexed by 'id - id_min'
+_Table = namedtuple("_Table", "id_min members is_valid is_known")
+_DUPLICATE = object()
+_tables = {}
+
+def _get_table(cls):
+
+    table = _tables.get(cls)
+    if not table is None: return table
+
+    ids = [s.id for s in cls]
+    id_min = min(ids)
+
+    members  = np.full(max(ids) - id_min + 1, None, dtype=object)
+    is_valid = np.zeros(len(members), dtype=bool)
+    for s in cls:
+        i = s.id - id_min
+        members[i] = s if members[i] is None else _DUPLICATE
+        is_valid[i] = s.is_valid
+
+    is_known = np.array([not s is None and not s is _DUPLICATE for s in members], dtype=bool)
+    _tables[cls] = table = _Table(id_min, members, is_valid, is_known)
+    return table
+
+def _check_ids(cls, table, ids):
+
+    idx = np.asarray(ids, dtype=np.int64) - table.id_min
+    if idx.size == 0: return idx
+
+    is_out = (idx < 0) | (idx >= len(table.members))
+    if not is_out.any() and table.is_known[idx].all(): return idx
+
+    # Fall back to get_by_id to raise the right error for the first bad ID
+    for id in np.asarray(ids).ravel(): cls.get_by_id(int(id))
+    return idx
 
 
 class Chained:
 
     def __init__(self):
         self._statuses = {}
+        # Flattened global ID tables, rebuilt lazily after an append
+        self._ids     = None
+        self._members = None
+        self._valid   = None
+        self._known   = None
     
     def _get_key(self, status):
         return status
 
     def get_id(self, status):
-        key = self._get_key(type(status))
-        offset = self._statuses[key]['id_start']
-        return status.id + offset
+        if self._ids is None: self.__build_tables()
+        try:
+            return self._ids[status]
+        except KeyError:
+            key = self._get_key(type(status))
+            raise KeyError("Status class '%s' is not in Chained status." % key)
+
+    def get_ids(self, statuses):
+        """Vectorized get_id, returns an integer array of global IDs.
+        :param statuses: Iterable of statuses
+        """
+        if self._ids is None: self.__build_tables()
+        ids = self._ids
+        return np.fromiter((ids[s] for s in statuses), dtype=np.int64)
 
     def get_status(self, id):
 
-        for key in self._statuses:
-            id_start = self._statuses[key]['id_start']
-            id_end   = self._statuses[key]['id_end']
-            if id_start <= id and id < id_end:
-                return self._statuses[key]['class'].get_by_id(id-id_start)
+        if self._members is None: self.__build_tables()
+        if 0 <= id < len(self._members) and self._known[id]:
+            return self._members[id]
 
         raise TypeError("ID %d can not be matched to a Chained status." % id )
+
+    def get_statuses(self, ids):
+        """Vectorized get_status, returns an object array of statuses.
+        :param ids: Array like of integer global IDs
+        """
+        ids = self.__check_ids(ids)
+        return self._members[ids]
+
+    def max(self, ids): return self.get_status(int(np.max(ids)))
+
+    def min(self, ids): return self.get_status(int(np.min(ids)))
+
+    def all_valid(self, ids): 
+        ids = self.__check_ids(ids)
+        return bool(np.all(self._valid[ids]))
+
+    def any_valid(self, ids): 
+        ids = self.__check_ids(ids)
+        return bool(np.any(self._valid[ids]))
     
     def has(self, status):
         return status in self._statuses
@@ -116,17 +210,47 @@ class Chained:
         id_start += id_min
         id_end = id_start + (id_max - id_min) + 1
 
+        # Note: Offset maps lowest enum ID to id_start
         key = self._get_key(derived_type)
-        self._statuses[key] = {'id_start': id_start    , 
-                               'id_end'  : id_end      ,
-                               'class'   : derived_type}
+        self._statuses[key] = {'id_start': int(id_start)         , 
+                               'id_end'  : int(id_end)           ,
+                               'offset'  : int(id_start - id_min),
+                               'class'   : derived_type          }
+        self._ids = self._members = self._valid = self._known = None
+
+    def __build_tables(self):
 
+        n = max([s['id_end'] for s in self._statuses.values()], default=0)
+        members = np.full(n, None, dtype=object)
+        valid   = np.zeros(n, dtype=bool)
+        known   = np.zeros(n, dtype=bool)
+        ids     = {}
 
-        
+        for key, s in self._statuses.items():
+            offset = s['offset']
+            table = _get_table(s['class'])
+            for m in s['class']: ids[m] = int(m.id + offset)
 
+            # Note: Duplicate enum IDs are left unmatched like in get_by_id
+            i = np.flatnonzero(table.is_known)
+            members[i + table.id_min + offset] = table.members[i]
+            valid  [i + table.id_min + offset] = table.is_valid[i]
+            known  [i + table.id_min + offset] = True
 
+        self._ids, self._members, self._valid, self._known = ids, members, valid, known
 
+    def __check_ids(self, ids):
 
+        if self._members is None: self.__build_tables()
+        ids = np.asarray(ids, dtype=np.int64)
+        if ids.size == 0: return ids
 
+        is_out = (ids < 0) | (ids >= len(self._members))
+        if is_out.any(): 
+            raise TypeError("ID %d can not be matched to a Chained status." % ids[is_out][0])
 
+        is_unknown = ~self._known[ids]
+        if is_unknown.any(): 
+            raise TypeError("ID %d can not be matched to a Chained status." % ids[is_unknown][0])
 
+        return ids
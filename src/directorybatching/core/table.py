@@ -1,9 +1,14 @@
 
 import directorybatching.core.status as status
+import directorybatching.core.job as job
+import directorybatching.core.directory as directory
 
 from collections import namedtuple
+from types import SimpleNamespace
 import pandas as pd
 import os
+import ast
+import json
 import numpy as np
 
 class Status(status.Base):
@@ -22,6 +27,20 @@ STATUS_COLUMN = "status"
 LEAF_ID_COLUMN = "batch_dir_leaf_id"
 FILES_COLUMN = 'job_files'
 
+def _json_default(val):
+    if isinstance(val, np.generic): return val.item()
+    if val is pd.NA: return None
+    return str(val)
+
+def _parse_files(val):
+    # Note: Job files are written to CSV as dictionary literals
+    if not type(val) is str: return {}
+    try:
+        files = ast.literal_eval(val)
+    except (ValueError, SyntaxError):
+        return {}
+    return files if type(files) is dict else {}
+
 class Table:
 
     def __init__(self, batch):
@@ -33,34 +52,54 @@ class Table:
         self._logger = batch.logger
 
         self._data_dpath = os.path.join(batch.dpaths.out, 'aggregate_data.csv')
+        # Append-only journal of rows changed since CSV was last written 
+        self._journal_fpath = os.path.join(batch.dpaths.out, 'aggregate_data.journal')
 
         # Tree representation of directory structure 
-        #self._dstruct = batch._dstruc
+        self._dstruct = batch._dstruc
         # df       - Dataframe of directory parameters read 
         # df_idmap - Dictionary mapping some ID in dataframe to
         #            leafs nodes in order to propagate updates
         self._df, self._df_idmap = batch._dstruc.to_dataframe()
     
         # Dummy internal columns   
+        # Note: Statuses are stored as Chained IDs, enums are only 
+        #       materialized when writing or updating nodes 
         df = self._df
-        df[STATUS_ID_COLUMN] = df[STATUS_COLUMN].apply(self._smaps.get_id) 
         df[VALID_COLUMN] = True
         df[FILES_COLUMN] = None
 
+        # Columns added from job parameters  
+        self._job_columns = set()
+
         # Configuring dataframe column arrangement and row sorting 
         cols = ([m.name for m in batch._dmaps])
         self._sort_columns = cols.copy() ; self._sort_columns.append(STATUS_ID_COLUMN)
-        self._start_columns = cols.copy(); self._start_columns.append(STATUS_COLUMN)
+        self._start_columns = cols.copy(); self._start_columns.append(STATUS_ID_COLUMN)
         self._df = self.__sort_df(self._df)
+
+        # Note: Read before the CSV is rewritten, e.g., by sync_table_maps, see restore_completed 
+        self._df_prev = self.__read_prev_data() if batch._is_continue else None
+
+    def __read_prev_data(self):
+
+        # Applying leftover journal of an interrupted run first 
+        Table.materialize(self._data_dpath, self._journal_fpath)
+
+        if not os.path.isfile(self._data_dpath):
+            self._logger.warning("No CSV file saved by previous run at '%s'." % self._data_dpath)
+            return None
+
+        df_prev = pd.read_csv(self._data_dpath).drop_duplicates(subset=LEAF_ID_COLUMN)
+        return df_prev.set_index(LEAF_ID_COLUMN)
         
 
     def sync_data(self, updates={}, new_rtnvals={}):
 
-        def update(row):
+        def update(is_valid):
 
-            is_valid = row[VALID_COLUMN]
             tp = type(is_valid)
-            if tp is bool: return is_valid
+            if tp is bool or tp is np.bool_: return bool(is_valid)
 
             if issubclass(tp, status.Base): 
                 return is_valid.is_valid
@@ -68,23 +107,48 @@ class Table:
             raise TypeError()
 
         df = self._df
-        df[VALID_COLUMN]  = df.apply(update, axis=1)
-        Table.write_df(df, self._data_dpath)
+        if not df[VALID_COLUMN].dtype == bool:
+            df[VALID_COLUMN] = df[VALID_COLUMN].map(update).astype(bool)
         self._df = df
 
+        # Only writing changed rows for job updates, full CSV otherwise
+        if len(updates) > 0:
+            is_changed = df[LEAF_ID_COLUMN].isin(list(updates.keys()))
+            Table.append_journal(df[is_changed], self._journal_fpath, self._smaps)
+        else:
+            self.write_data()
+
+        # Note: Marking leafs so only their ancestors' statuses are rolled up 
+        dstruct = self._dstruct
         if len(updates) > 0:
             for id, vals in updates.items():
+                node = self._df_idmap[id]
                 for name, val in vals.items():
-                    setattr(self._df_idmap[id], name, val)
+                    setattr(node, name, val)
+                if STATUS_COLUMN in vals: dstruct.mark_dirty(node)
         else:
-            for id, status in self._df[[LEAF_ID_COLUMN, STATUS_COLUMN]].values:
-                self._df_idmap[id].status = status
+            statuses = self._smaps.get_statuses(df[STATUS_ID_COLUMN].values)
+            for id, status in zip(df[LEAF_ID_COLUMN].values, statuses):
+                node = self._df_idmap[id]
+                node.status = status
+                dstruct.mark_dirty(node)
 
 
         if len(new_rtnvals) > 0:
             for id, vals in new_rtnvals.items():
-                self._df_idmap[id].rtnval.update(new_rtnvals)
+                self._df_idmap[id].rtnval.update(vals)
+
+
+    def rebind(self, dstruc):
+        # Mapping leaf IDs to nodes of new directory tree representation, see CompactTree
+        self._df_idmap = dstruc.views(self._df_idmap)
+        self._dstruct = dstruc
 
+    def write_data(self):
+
+        # Materializing full CSV and clearing journal 
+        Table.write_df(self._df, self._data_dpath, self._smaps)
+        if os.path.isfile(self._journal_fpath): os.remove(self._journal_fpath)
 
     def prep_list_job_args(self):
 
@@ -96,8 +160,7 @@ class Table:
 
         # Removing internal columns 
         drop = [STATUS_ID_COLUMN, VALID_COLUMN, 
-                LEAF_ID_COLUMN  , STATUS_COLUMN,
-                FILES_COLUMN]
+                LEAF_ID_COLUMN  , FILES_COLUMN]
         df = df.drop(columns=drop)
 
         # Formatting args as a list 
@@ -107,77 +170,120 @@ class Table:
 
     def update_from_jobs(self, jobs, results):
 
-
-        appends = []
-        updates = []
-        stypes = []
+        # Note: First result for a leaf is used if it has more than one 
+        appends = {}
+        updates = {}
         for j, r in zip(jobs, results):
-            updates.append({LEAF_ID_COLUMN: j._leaf_id   , 
-                            STATUS_COLUMN : r.status     ,
-                            FILES_COLUMN  : j._files      })#,
-                            #VALID_COLUMN  : r.is_continue})
-
-            appends.append({**{LEAF_ID_COLUMN: j._leaf_id}, 
-                            **r.job_params                })
+            leaf_id = int(j._leaf_id)
+            if leaf_id in updates: continue
 
-            stypes.append(type(r.status))
+            updates[leaf_id] = {STATUS_COLUMN: r.status, 
+                                FILES_COLUMN : j._files}
+            appends[leaf_id] = dict(r.job_params)
 
-        for stype in stypes:
+            stype = type(r.status)
             if not self._smaps.has(stype): self._smaps.append(stype)
+
+        if len(updates) == 0: return
         
         df = self._df
+
+        # Note: Explicit index as leaf IDs span the int64 range, setting them 
+        #       as index from a column overflows when inferring a range index 
+        index = pd.Index(list(updates.keys()), dtype='int64')
+        df_append = pd.DataFrame.from_records(list(appends.values()), index=index)
+        df_update = pd.DataFrame.from_records(list(updates.values()), index=index)
+
+        # Job parameters indexed by leaf id, columns not added by jobs, e.g., 
+        # directory and table columns, are kept and job values given a suffix
+        leaf_ids = df[LEAF_ID_COLUMN]
+        for col in df_append.columns:
+            name = col if col in self._job_columns or not col in df.columns else "%s__JOB__" % col 
+            self._job_columns.add(name)
+
+            vals = leaf_ids.map(df_append[col])
+            df[name] = vals.combine_first(df[name]) if name in df.columns else vals
+
+        # Set based selection of updated rows aligned to leaf ids
+        is_update = df[LEAF_ID_COLUMN].isin(df_update.index).values
+        update_ids = df[LEAF_ID_COLUMN].values[is_update]
+        df_update = df_update.reindex(update_ids)
+
+        # Note: Assigning through object arrays to keep values such as 
+        #       file dictionaries as is 
+        for col in df_update.columns:
+            if col == STATUS_COLUMN: continue
+            vals = df[col].to_numpy(dtype=object, copy=True)
+            vals[is_update] = df_update[col].to_numpy(dtype=object)
+            df[col] = vals
+
+        status_ids = df[STATUS_ID_COLUMN].to_numpy(copy=True)
+        status_ids[is_update] = self._smaps.get_ids(df_update[STATUS_COLUMN])
+        df[STATUS_ID_COLUMN] = status_ids
+
+        self._df = df
+
+        self.sync_data(updates, appends)
+
         
-        df_append = pd.DataFrame.from_records(appends)
-        if len(df_append.columns) > 1:
-            df = df.merge(df_append, how='left', on=LEAF_ID_COLUMN, suffixes=['', '__JOB__'])
 
 
-        df_update = pd.DataFrame.from_records(updates)
+    def is_restorable(self, leaf_id):
+        # Row of job saved by previous run, see restore_completed 
+        return not self._df_prev is None and leaf_id in self._df_prev.index
 
-        ids = df_update[LEAF_ID_COLUMN].values
-        cols = [c for c in df_update.columns if not c ==LEAF_ID_COLUMN]
+    def restore_completed(self, completed, prev_tree):
 
-        def update_status(row):
-            if not row[LEAF_ID_COLUMN] in ids: return row[STATUS_COLUMN]
-            other = df_update[df_update[LEAF_ID_COLUMN]==row[LEAF_ID_COLUMN]].iloc[0]
-            return other[STATUS_COLUMN]
+        """Restores rows of jobs completed in previous run from its saved tree and CSV 
+           file, rows are matched by stable leaf ID and tree leafs by directory path
 
-        for col in cols:
+        :param completed: List of (leaf ID, directory path) tuples of completed jobs.
+        :type  completed: list
+        :param prev_tree: Tree saved by previous run, see Structure.load_from_file
+        :type  prev_tree: SimpleNamespace or None
+        """
 
-            def update_status(row):
-                if not row[LEAF_ID_COLUMN] in ids: return row[col]
-                other = df_update[df_update[LEAF_ID_COLUMN]==row[LEAF_ID_COLUMN]].iloc[0]
-                return other[col]
+        df_prev = self._df_prev
+        self._df_prev = None
+        if len(completed) == 0: return
 
-            df[col] = df.apply(update_status, axis=1)
+        prev_leafs = {} if prev_tree is None else {l.dpath: l for l in prev_tree.leafs}
 
-        def update_status_id(row):
-            if not row[LEAF_ID_COLUMN] in ids: return row[STATUS_ID_COLUMN]
-            return self._smaps.get_id(row[STATUS_COLUMN])
-        
+        prev_files = {}
+        if not df_prev is None:
+            if FILES_COLUMN in df_prev.columns: prev_files = df_prev[FILES_COLUMN].to_dict()
+            # Note: Only columns added by jobs, others are rebuilt every run
+            cols = [c for c in df_prev.columns if not c in self._df.columns and not c == STATUS_COLUMN]
+            df_prev = df_prev[cols]
 
-        #df[STATUS_COLUMN] = df.apply(update_status, axis=1)
-        df[STATUS_ID_COLUMN] = df.apply(update_status_id, axis=1)
+        # Directory and table statuses are not job results
+        not_job = (directory.Status, Status)
 
+        jobs, results = [], []
+        for leaf_id, dpath in completed:
+            l = prev_leafs.get(dpath)
 
-        appends = {i[LEAF_ID_COLUMN]: {k: v for k,v in i.items() if not k == LEAF_ID_COLUMN} for i in appends}
-        updates = {i[LEAF_ID_COLUMN]: {k: v for k,v in i.items() if not k == LEAF_ID_COLUMN} for i in updates}
+            s = getattr(l, 'status', None)
+            if s is None or type(s) in not_job: s = job.Status.COMPLETED
 
-        #appends = {v: {k1: v1 for k1, v1 in appends if not k1==k} for k, v in appends.items() if k == LEAF_ID_COLUMN}
-        #print(appends)
-        self.sync_data(updates, appends)
+            params = {}
+            if not df_prev is None and leaf_id in df_prev.index:
+                row = df_prev.loc[leaf_id]
+                params = {k: v for k, v in row.items() if not pd.isna(v)}
 
-        
+            files = _parse_files(prev_files.get(leaf_id))
+            jobs.append(SimpleNamespace(_leaf_id=leaf_id, _files=files))
+            results.append(SimpleNamespace(status=s, job_params=params))
+
+        self.update_from_jobs(jobs, results)
 
 
     def __sort_df(self, df):
 
-        is_sorted = np.all([a==b for a, b in zip(df.columns, self._start_columns)])
+        start = [c for c in self._start_columns if c in df.columns]
 
-        if not is_sorted:
-            for n in reversed(self._start_columns):
-                if n in df.columns:
-                    df = df[[n] + [c for c in df.columns if not c == n]]
+        if not list(df.columns[:len(start)]) == start:
+            df = df[start + [c for c in df.columns if not c in start]]
 
         return df.sort_values(by=self._sort_columns)
 
@@ -234,15 +340,23 @@ class Table:
 
         df_both, df_only_dir, df_only_tbl = self.__merge_split(df_tbl, dmaps)
         
-        # Creating leaf ids for table only entries 
-        max_id = max(np.max(df_both[LEAF_ID_COLUMN].values), np.max(df_only_dir[LEAF_ID_COLUMN].values))
-        df_only_tbl[LEAF_ID_COLUMN] = np.arange(len(df_only_tbl)) + max_id + 1
+        # Creating stable leaf ids for table only entries from their values 
+        df_only_tbl[LEAF_ID_COLUMN] = directory.leaf_ids_from_df(dmaps, df_only_tbl)
+
+        is_dup = df_only_tbl[LEAF_ID_COLUMN].duplicated().values
+        if np.any(is_dup):
+            logger.warning("Ignoring %d duplicated table entries." % np.sum(is_dup))
+            df_only_tbl = df_only_tbl[~is_dup]
+
+        ids = np.concatenate([df_both[LEAF_ID_COLUMN].values, df_only_dir[LEAF_ID_COLUMN].values])
+        is_collision = np.isin(df_only_tbl[LEAF_ID_COLUMN].values, ids)
+        if np.any(is_collision):
+            logger.critical("Leaf IDs of %d table entries collide with directory leaf IDs." % np.sum(is_collision), ValueError)
 
         if len(df_both) == 0: logger.error("No directories matched to table at path '%s'." % self._table_fpath)
 
         def init_table(df, status):
             df[STATUS_ID_COLUMN] = self._smaps.get_id(status)
-            df[STATUS_COLUMN] = status
             df[VALID_COLUMN] = status.is_valid
             df[LEAF_ID_COLUMN] = df[LEAF_ID_COLUMN].astype(int)
             # Merge resets to float
@@ -252,8 +366,8 @@ class Table:
         df_only_dir = init_table(df_only_dir, Status.DIR_ONLY)
         df_only_tbl = init_table(df_only_tbl, Status.TBL_ONLY)
 
-        Table.log_missing(df_only_dir, logs_dpath, "orphan_directories.csv", "directories did not match to table entries", df_dir, logger)
-        Table.log_missing(df_only_tbl, logs_dpath, "orphan_table_rows.csv" , "table entries did not match to directories", df_tbl, logger)
+        Table.log_missing(df_only_dir, logs_dpath, "orphan_directories.csv", "directories did not match to table entries", df_dir, logger, self._smaps)
+        Table.log_missing(df_only_tbl, logs_dpath, "orphan_table_rows.csv" , "table entries did not match to directories", df_tbl, logger, self._smaps)
 
 
         df = pd.concat([df_both, df_only_dir, df_only_tbl], ignore_index=True)
@@ -265,29 +379,81 @@ class Table:
         return df_only_tbl
 
     @classmethod 
-    def write_df(cls, df, fpath):
-
-        df = df.copy()
+    def format_df(cls, df, smaps):
 
-        #stat_info =[x for x in zip(df[STATUS_COLUMN], df[STATUS_ID_COLUMN])]
-        #df[STATUS_COLUMN] = ["[%d] %s" % (n, s.display_string) for s, n in stat_info]
+        df = df.drop(columns=[VALID_COLUMN])
 
-        def format_status(row):
-            string = "[%d] %s" % (row[STATUS_ID_COLUMN], row[STATUS_COLUMN].display_string)
-            if "msg" in row:
-                msg = row["msg"]
-                if not msg is None and not msg == "":
-                    string = "%s %s" % (string, msg)
+        # Formatting distinct statuses once instead of per row
+        ids = df[STATUS_ID_COLUMN]
+        display = {id: smaps.get_status(id).display_string for id in pd.unique(ids)}
+        strings = "[" + ids.astype(str) + "] " + ids.map(display)
 
-            return string
+        if "msg" in df.columns:
+            msgs = df["msg"]
+            has_msg = msgs.notna() & (msgs != "")
+            strings[has_msg] = strings[has_msg] + " " + msgs[has_msg].astype(str)
 
-        df[STATUS_COLUMN] = df.apply(format_status, axis=1)
+        # Status strings take the place of the status ID column 
+        df.insert(df.columns.get_loc(STATUS_ID_COLUMN), STATUS_COLUMN, strings)
         
-        df = df.drop(columns=[STATUS_ID_COLUMN, VALID_COLUMN])
-        df.to_csv(fpath, index=False)
+        return df.drop(columns=[STATUS_ID_COLUMN])
+
+    @classmethod 
+    def write_df(cls, df, fpath, smaps):
+        cls.format_df(df, smaps).to_csv(fpath, index=False)
+
+    @classmethod
+    def append_journal(cls, df, fpath, smaps):
+
+        if len(df) == 0: return
+        # Note: One JSON record per line so partially written journals 
+        #       are still readable up to the last complete line, floats 
+        #       are written in full as by to_csv
+        records = cls.format_df(df, smaps).to_dict('records')
+        lines = ''.join(json.dumps(r, default=_json_default) + "\n" for r in records)
+        with open(fpath, 'a') as f: f.write(lines)
+
+    @classmethod
+    def materialize(cls, fpath, journal_fpath):
+
+        """Applies journal of changed rows to CSV file, e.g., after an interrupted run
+
+        :param fpath:         Path to CSV file.
+        :type  fpath:         str
+        :param journal_fpath: Path to journal file.
+        :type  journal_fpath: str
+        """
+
+        if not os.path.isfile(journal_fpath): return
+
+        df = pd.read_csv(fpath)
+
+        with open(journal_fpath) as f: lines = [l for l in f if l.endswith("\n")]
+
+        if len(lines) > 0:
+            df_journal = pd.DataFrame.from_records([json.loads(l) for l in lines])
+            df_journal = df_journal.drop_duplicates(subset=LEAF_ID_COLUMN, keep='last')
+
+            # Latest journal record replaces row with same leaf id 
+            df = df.set_index(LEAF_ID_COLUMN)
+            df_journal = df_journal.set_index(LEAF_ID_COLUMN)
+            ids = df_journal.index[df_journal.index.isin(df.index)]
+
+            for col in df_journal.columns:
+                if not col in df.columns: df[col] = None
+                vals = df[col].to_numpy(dtype=object, copy=True)
+                vals[df.index.get_indexer(ids)] = df_journal.loc[ids, col].to_numpy(dtype=object)
+                df[col] = vals
+
+            df = df.reset_index()
+            cols = [c for c in pd.read_csv(fpath, nrows=0).columns]
+            cols.extend([c for c in df.columns if not c in cols])
+            df[cols].to_csv(fpath, index=False)
+
+        os.remove(journal_fpath)
 
     @classmethod
-    def log_missing(cls, df1, dpath, fname, msg, df2, logger):
+    def log_missing(cls, df1, dpath, fname, msg, df2, logger, smaps):
         
         n1, n2 = len(df1), len(df2)
         if n1 == 0: return
@@ -295,7 +461,7 @@ class Table:
         per=100.0*n1/n2
         fpath = os.path.join(dpath, fname)
         logger.warning("%d [%4.1f%%] %s, CSV file written to '%s'" % (n1, per, msg, fpath))     
-        cls.write_df(df1, fpath)
+        cls.write_df(df1, fpath, smaps)
 
 
     def __merge_split(self, df_tbl, dmaps):
@@ -309,12 +475,15 @@ class Table:
         tmp_cols = ["%s__TEMP_COMPARE__" % n for n, _ in flt_cols]
 
         for (t, parser), tc in zip(flt_cols, tmp_cols):
-            df_tbl[tc] = df_tbl[t].apply(parser.raw_reverse)
-            df_dir[tc] = df_dir[t].apply(parser.raw_reverse)
+            df_tbl[tc] = parser.to_keys(df_tbl[t].to_numpy())
+            df_dir[tc] = parser.to_keys(df_dir[t].to_numpy())
 
-        # Appending 'integerized' columns for merge
+        # Appending integer key columns for merge
         match_cols.extend(tmp_cols)
 
+        # Note: Nullable ids as unmatched table rows have none, float would round 64-bit ids 
+        df_dir[LEAF_ID_COLUMN] = df_dir[LEAF_ID_COLUMN].astype('Int64')
+
         # Doing outer merge and using indicator to seperated matches as non-matches
         suffixes = ['_tbl_map', '_dir_map']
         total_merge = df_tbl.merge(df_dir, on=match_cols, how='outer', indicator=True, suffixes=suffixes)
@@ -342,7 +511,7 @@ class Table:
         del_cols = ['_merge']
         # Removing duplicated columns from merge  
         del_cols.extend([c for c in df.columns if c.endswith(drop_suffix)])
-        # Removing temporary 'integerized' float columns 
+        # Removing temporary integer key columns 
         del_cols.extend(tmp_cols)
         # Optional extra columns to remove 
         del_cols.extend(extra_drops)
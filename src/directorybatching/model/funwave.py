@@ -3,9 +3,15 @@
 import directorybatching.core.status as status
 from directorybatching.core.batch import Batch
 from directorybatching.core.job import Job
+import directorybatching.core.scheduler as scheduler
+from directorybatching.core.scheduler import SchedulerIndex, FileQueueProvider
 
 import os
+import locale
+import hashlib
+import pickle
 import numpy as np
+from types import SimpleNamespace
 
 class Status(status.Base):
 
@@ -27,12 +33,46 @@ class Status(status.Base):
     VALID      = status.Tuple(15, "Valid simulation")
     COMPLETED  = status.Tuple(16, "Previously Completed") 
 
-    def _is_valid(self): return self == Status.VALID
+    # Note: Completed jobs are valid results, only not executed again
+    def _is_valid(self): return self == Status.VALID or self == Status.COMPLETED
 
 class FunwaveBatch(Batch):
-    def __init__(self, job_class,  name="FunwaveBatch",  multi_logger=None):
+    def __init__(self, job_class,  name="FunwaveBatch",  multi_logger=None, queue_provider=None):
         super().__init__(job_class, name, multi_logger)
 
+        # Note: Provider passed directly, e.g., scheduler.FakeQueueProvider, takes precedence
+        if queue_provider is None and not self._args.queue_file is None:
+            queue_provider = FileQueueProvider(self._args.queue_file)
+        self._queue_provider = queue_provider
+
+    def _parse_model_cmd_args(self, parser):
+        parser = super()._parse_model_cmd_args(parser)
+        parser.add_argument('--input-cache', type=str, default=None,
+                            help="Directory for caching parsed input.txt files across processes and runs.")
+        parser.add_argument('--hpc-path', type=str, action='append', default=None,
+                            help="Directory of PBS/Slurm output files matched to jobs by job id suffix of "\
+                                 "job directory, can be repeated. Job directories are always searched.")
+        parser.add_argument('--queue-file', type=str, default=None,
+                            help="Captured output of 'qstat -f' or 'squeue -h -o \"%%i %%T %%Z\"' for "\
+                                 "marking queued and running jobs.")
+        return parser
+
+    def _prep_job_contexts(self, list_args):
+
+        # Note: Scheduler output files are indexed once instead of searched by each job
+        index = SchedulerIndex([dpath for _, dpath, _ in list_args], self._args.hpc_path)
+        self.logger.info("Indexed %d HPC output files." % len(index))
+
+        # Note: Scheduler is queried once, jobs only look up their state 
+        queue = scheduler.QueueSnapshot()
+        if not self._queue_provider is None:
+            queue = self._queue_provider.snapshot()
+            self.logger.info("Read %d queued or running scheduler jobs." % len(queue))
+
+        return [SimpleNamespace(hpc_fpaths  = index.get(dpath), 
+                                queue_state = queue.get(dpath, index.get_jobid(dpath))) 
+                for _, dpath, _ in list_args]
+
 class FunwaveJob(Job):
 
 
@@ -41,6 +81,9 @@ class FunwaveJob(Job):
 
         logger = self.logger
 
+        is_continue, rtnvals = self._validate_queue()
+        if not is_continue: return rtnvals
+
         is_valid, rtnvals = self._validate_input(dpath)
         if not is_valid: return rtnvals  
         job_params = rtnvals
@@ -51,7 +94,17 @@ class FunwaveJob(Job):
         is_continue, rtnvals = self._validate_hpc(dpath)
         if not is_continue: return rtnvals
 
-        return self.prep_return(Status.UNKNOWN, job_params, "Reached end of checks")
+        return self.prep_return(Status.UNKNOWN, "Reached end of checks")
+
+    def _validate_queue(self):
+
+        context = self.context
+        state = None if context is None else context.queue_state
+
+        if state == scheduler.QUEUED:  return False, self.prep_return(Status.QUEUED)
+        if state == scheduler.RUNNING: return False, self.prep_return(Status.RUNNING)
+
+        return True, None
 
     def _validate_input(self, dpath):
 
@@ -61,7 +114,9 @@ class FunwaveJob(Job):
         if not is_input: return False, self.prep_return(Status.NO_INPUT)
 
         try:
-            iparams = read_input_file(fpath)
+            # Note: Only parameters in job maps are used 
+            names = [j.param for j in self._maps]
+            iparams = read_input_file(fpath, names, getattr(self._args, 'input_cache', None))
         except Exception as e:
             return False, self.prep_return(Status.INPUT_FAIL)
 
@@ -108,7 +163,7 @@ class FunwaveJob(Job):
         fpath = os.path.join(dpath, 'LOG.txt')
         is_log = os.path.isfile(fpath)
 
-        if not is_log: return self.prep_return(Status.NO_LOG)
+        if not is_log: return False, self.prep_return(Status.NO_LOG)
 
         strings = ["Normal Termination!", "PRINTING FILE NO. 99999"]
         
@@ -135,106 +190,220 @@ class FunwaveJob(Job):
 
     def _validate_hpc(self, dpath):
 
-        raise NotImplementedError()
-
-        # Implement find HPC error 
+        # Note: Output files of newest scheduler job first, see SchedulerIndex.get
+        context = self.context
+        fpaths = [] if context is None else context.hpc_fpaths
+        if len(fpaths) == 0: return False, self.prep_return(Status.NO_HPC)
 
-        strings = ["application called MPI_Abort", "PBS: job killed: walltime"]
+        strings = ["application called MPI_Abort", "PBS: job killed: walltime", "DUE TO TIME LIMIT"]
         
-        try:
-            matches = any_string_in_file(fpath, strings)
-        except Exception as e:
-            return False, self.prep_return(Status.HPC_FAIL)
+        for fpath in fpaths:
+            try:
+                matches = any_string_in_file(fpath, strings)
+            except Exception as e:
+                return False, self.prep_return(Status.HPC_FAIL, fpath)
 
-        # Skipping to next validation methjod
-        if np.sum(matches) == 0: return True, None
+            # Checking next output file
+            if np.sum(matches) == 0: continue
 
-        if matches[0]:
-            return False, self.prep_return(Status.ABORTED)
+            if matches[0]:
+                return False, self.prep_return(Status.ABORTED, fpath)
 
-        if matches[1]:
-            return False, self.prep_return(Status.WALLTIME)
+            if matches[1] or matches[2]:
+                return False, self.prep_return(Status.WALLTIME, fpath)
+
+            raise Exception("Not all string matches handled correctly in _validate_hpc")
 
+        # Skipping to next validation method
+        return True, None
 
-        raise Exception("Not all string matches handled correctly in _validate_hpc")
 
+# Size of blocks read from end of file when searching in reverse 
+TAIL_BLOCK_SIZE = 1 << 20
 
 def any_string_in_file(fpath, strings, is_reverse=True):
 
+    """Finds first line, or last line if reversed, containing any of the strings 
+
+    :param fpath:      Path to text file.
+    :type  fpath:      str
+    :param strings:    String or list of strings to search for.
+    :type  strings:    str or str list
+    :param is_reverse: Searching from end of file.
+    :type  is_reverse: bool
+
+    :rtype: bool list of strings found in line or False if no line matches
+    """
+
     if type(strings) is str: strings=[strings]
 
-    with open(fpath) as f: lines = f.readlines()
-    if is_reverse: lines = reversed(lines)
+    # Note: Strings spanning lines can only be matched line by line 
+    is_multiline = any('\n' in s or '\r' in s for s in strings)
+
+    if is_reverse and not is_multiline: return _any_string_in_tail(fpath, strings)
+
+    with open(fpath) as f: 
+        lines = reversed(f.readlines()) if is_reverse else f
 
-    is_found = False
+        for line in lines:
+            matches = [s in line for s in strings]
+            if any(matches): return matches
 
-    for line in lines:
-        matches = [s in line for s in strings]
-        if np.any(matches): return matches
+    return False
+
+def _any_string_in_tail(fpath, strings):
+
+    # Reading blocks from end of file keeping only the partial line at the start 
+    # of each block, memory is bounded by block size and longest line 
+    encoding = locale.getpreferredencoding(False)
+    patterns = [s.encode(encoding) for s in strings]
+
+    with open(fpath, 'rb') as f:
+
+        pos = f.seek(0, os.SEEK_END)
+        carry = b''
+
+        while pos > 0:
+            start = max(0, pos - TAIL_BLOCK_SIZE)
+            f.seek(start)
+            buf = f.read(pos - start) + carry
+            pos = start
+
+            # Only searching complete lines, first line may continue in previous block 
+            if start > 0:
+                i = buf.find(b'\n')
+                if i < 0:
+                    carry = buf
+                    continue
+                carry, buf = buf[:i+1], buf[i+1:]
+            else:
+                carry = b''
+
+            # Last line with any match contains rightmost match  
+            found = [buf.rfind(p) for p in patterns]
+            i = max(found)
+            if i < 0: continue
+
+            j = buf.find(b'\n', i)
+            line = buf[buf.rfind(b'\n', 0, i)+1:len(buf) if j < 0 else j+1]
+
+            # Note: Splitting on carriage returns as text mode would
+            line = line.decode(encoding).replace('\r\n', '\n').replace('\r', '\n')
+            for sub_line in reversed(line.split('\n')):
+                matches = [s in sub_line for s in strings]
+                if any(matches): return matches
 
     return False
 
 
-def read_input_file(fpath):
+# Parsed parameters by content hash of input file, oldest entry is dropped 
+# when full, and parsed lines by line as input files mostly share lines  
+INPUT_CACHE_SIZE = 1024
+LINE_CACHE_SIZE  = 1 << 16
+_INPUT_CACHE = {}
+_LINE_CACHE  = {}
+
+def read_input_file(fpath, names=None, cache_dpath=None):
     """
     Convert FUNWAVE input/driver file to dictionary
 
-    :param fpath: Path to FUNWAVE input/driver file
-    :type fpath: str
+    :param fpath:       Path to FUNWAVE input/driver file
+    :type  fpath:       str
+    :param names:       Only returning parameters with these names, all if None
+    :type  names:       iterable or None
+    :param cache_dpath: Directory of on-disk cache of parsed files shared across 
+                        processes and runs, not used if None
+    :type  cache_dpath: str or None
     """
 
-    def _split_first(line, char):
+    with open(fpath, 'rb') as fh: data = fh.read()
+    key = hashlib.blake2b(data, digest_size=16).hexdigest()
 
-        first, *second = line.split(char)
-        second = char.join(second)
-        return first, second
+    params = _INPUT_CACHE.get(key)
 
-    def _filter_comment(line):
+    if params is None and not cache_dpath is None: 
+        params = _load_cached_input(cache_dpath, key)
 
-        if "!" not in line: return False, line, None
-        first, second = _split_first(line, "!")
-        return True, first, second
+    if params is None:
+        text = data.decode(locale.getpreferredencoding(False))
+        # Note: Universal newlines as in text mode
+        if '\r' in text: text = text.replace('\r\n', '\n').replace('\r', '\n')
+        params = _parse_input(text)
+        if not cache_dpath is None: _save_cached_input(cache_dpath, key, params)
 
+    if len(_INPUT_CACHE) >= INPUT_CACHE_SIZE: _INPUT_CACHE.pop(next(iter(_INPUT_CACHE)))
+    _INPUT_CACHE[key] = params
 
-    with open(fpath, 'r') as fh: lines = fh.readlines()
+    if names is None: return dict(params)
+    return {k: params[k] for k in names if k in params}
 
-    params = {}
-    for line in lines:
+def _parse_input(text):
 
-        if not '=' in line: continue
-        first, second = _split_first(line, "=")
+    cache = _LINE_CACHE
+    if len(cache) >= LINE_CACHE_SIZE: cache.clear()
 
-        is_comment, name, _  = _filter_comment(first.strip())
-        if is_comment: continue
+    params = {}
+    for line in text.split('\n'):
 
-        is_comment, val_str, _ = _filter_comment(second.strip())
+        item = cache.get(line, False)
+        if item is False:
+            item = cache[line] = _parse_line(line)
 
-        params[name] = parse_str(val_str)
+        if not item is None: params[item[0]] = item[1]
 
     return params
 
+def _parse_line(line):
+
+    name, is_sep, val_str = line.partition('=')
+    if not is_sep: return None
+
+    name = name.strip()
+    if '!' in name: return None
+
+    # Note: Value before comment is not stripped again, e.g., 'T ' is a string
+    val_str = val_str.strip().partition('!')[0]
+    return name, parse_str(val_str)
+
+def _load_cached_input(dpath, key):
+    try:
+        with open(os.path.join(dpath, key + '.pkl'), 'rb') as f: return pickle.load(f)
+    except Exception:
+        return None
+
+def _save_cached_input(dpath, key, params):
+    # Note: Written to temporary file and renamed as other processes may read it 
+    fpath = os.path.join(dpath, key + '.pkl')
+    tmp_fpath = "%s.%d.tmp" % (fpath, os.getpid())
+    try:
+        os.makedirs(dpath, exist_ok=True)
+        with open(tmp_fpath, 'wb') as f: pickle.dump(params, f)
+        os.replace(tmp_fpath, fpath)
+    except Exception:
+        if os.path.isfile(tmp_fpath): os.remove(tmp_fpath)
+
 def parse_str(val):
 
-    def cast_type(val, cast):
+    # Note: Same result as casting to both int and float, but only 
+    #       casting to float if int fails or to compare them
+    try:
+        ival = int(val)
+    except ValueError:
         try:
-            return cast(val)
+            return float(val)
         except ValueError:
-            return None
+            pass
 
-    ival = cast_type(val, int)
-    fval = cast_type(val, float)
-
-    if ival is None and fval is None:
         if type(val) is str and len(val) == 1:
             if val[0] == 'T': return True
             if val[0] == 'F': return False
 
         return str(val)
 
-    elif ival is not None and fval is not None:
-        return ival if ival == fval else fval
-    elif fval is not None: # and ival is None
-        return fval
-    else: # fval is None, ival is not None
+    try:
+        fval = float(val)
+    except ValueError:
         # Case should not be possible
         raise Exception('Unexpected State')
+
+    return ival if ival == fval else fval
@@ -0,0 +1,46 @@
+import os
+import sys
+import subprocess
+import pandas as pd
+import pytest
+
+TESTS_DPATH = os.path.dirname(os.path.abspath(__file__))
+SRC_DPATH = os.path.join(os.path.dirname(TESTS_DPATH), 'src')
+
+for dpath in (SRC_DPATH, TESTS_DPATH):
+    if not dpath in sys.path: sys.path.insert(0, dpath)
+
+import fixture_batch
+
+# Note: Output directory name, see Batch.__init_directory
+OUT_DNAME = 'batch_postprocessing'
+
+def run_batch(root, *args, timeout=120):
+    """Runs fixture batch in a new process, see fixture_batch
+
+    :rtype: subprocess.CompletedProcess
+    """
+
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([SRC_DPATH, env.get('PYTHONPATH', '')])
+    cmd = [sys.executable, os.path.join(TESTS_DPATH, 'fixture_batch.py'), '-rp', str(root), *args]
+    return subprocess.run(cmd, env=env, capture_output=True, text=True, timeout=timeout)
+
+def read_output(root):
+    return pd.read_csv(os.path.join(root, OUT_DNAME, 'aggregate_data.csv'))
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / 'root'
+    dpaths = fixture_batch.make_tree(str(root))
+    return str(root), dpaths
+
+@pytest.fixture
+def new_batch(monkeypatch):
+    """Constructs fixture batch in this process from command line arguments"""
+
+    def new(root, *args, btype=fixture_batch.FixtureBatch):
+        monkeypatch.setattr(sys, 'argv', ['fixture_batch.py', '-rp', str(root), *args])
+        return btype(fixture_batch.FixtureJob)
+
+    return new
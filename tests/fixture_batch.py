@@ -0,0 +1,122 @@
+import os
+import sys
+import time
+import itertools
+import multiprocessing
+import directorybatching.core.status as status
+import directorybatching.core.parser as parser
+from directorybatching.model import FunwaveJob, FunwaveBatch
+from directorybatching.core.directory import Map as DirectoryMap
+from directorybatching.core.table import Map as TableMap
+from directorybatching.core.job import Map as JobMap
+
+# Name of file written by each executed job, see FixtureJob.execute
+EXEC_FNAME = 'executed.txt'
+
+# Number of lines logged by each executed job, more than a worker sends at once 
+EXEC_LOG_LINES = 100
+
+# Environment variable of multiprocessing start method, e.g., 'spawn'
+START_ENV = 'FIXTURE_START_METHOD'
+
+# Environment variable of job delays, e.g., 'validate:1015:2,execute:1001:4' 
+# delays validation of job 1015 by 2s and execution of job 1001 by 4s
+DELAY_ENV = 'FIXTURE_DELAYS'
+
+class Status(status.Base):
+
+    OK = status.Tuple(1, "ok")
+
+    def _is_valid(self): return self == Status.OK
+
+def make_tree(root, logs=None):
+    """Creates 16 FUNWAVE job directories, e.g., 'period8/depth5/relH032/m1/cd010_1001', 
+       with LOG.txt contents chosen by job id
+
+    :param logs: Function of job id returning LOG.txt contents or None for no file,
+                 defaults to alternating normal termination and instability 
+    :type  logs: function or None
+
+    :rtype: str list of job directory paths
+    """
+
+    if logs is None:
+        logs = lambda jid: "Normal Termination!\n" if jid % 2 == 0 else "PRINTING FILE NO. 99999\n"
+
+    dpaths = []
+    items = itertools.product([8, 10], [5], ['032', '050'], [1, 2], ['010', '020'])
+    for jid, (T, d, H, m, cd) in enumerate(items, 1001):
+
+        dpath = os.path.join(root, 'period%d' % T, 'depth%d' % d, 'relH%s' % H, 'm%d' % m, 'cd%s_%d' % (cd, jid))
+        os.makedirs(dpath)
+        dpaths.append(dpath)
+
+        with open(os.path.join(dpath, 'input.txt'), 'w') as f:
+            f.write("DX = 1.0\nCFL = 0.5\nMglob = %d\n" % (100*m))
+
+        log = logs(jid)
+        if log is None: continue
+        with open(os.path.join(dpath, 'LOG.txt'), 'w') as f: f.write(log)
+
+    return dpaths
+
+def make_table(fpath):
+    # Rows of all directories of make_tree
+    rows = ["%d,%d,%.2f,%d,%.2f" % r for r in itertools.product([8, 10], [5], [0.32, 0.5], [1, 2], [0.1, 0.2])]
+    with open(fpath, 'w') as f: f.write("T,d,H,m,cd\n" + "\n".join(rows) + "\n")
+
+_VALIDATOR = parser.StartsWith()
+
+class FixtureBatch(FunwaveBatch):
+
+    def construct_dir_maps(self):
+        v = _VALIDATOR
+        return [DirectoryMap('period', 'period', parser.Integer(v)), 
+                DirectoryMap('depth' , 'depth' , parser.Integer(v)),
+                DirectoryMap('relH'  , 'relH'  , parser.Decimal(v, 2)), 
+                DirectoryMap('m'     , 'm'     , parser.Integer(v)),
+                DirectoryMap('cd'    , 'cd'    , parser.Decimal(v, 2, preprocessor=parser.Preprocessor.JobID()))]
+
+    def construct_job_maps(self):
+        return [JobMap('dx', 'DX'), JobMap('CFL', 'CFL'), JobMap('mglob', 'Mglob')]
+
+class FixtureTableBatch(FixtureBatch):
+
+    def construct_table_maps(self):
+        return [TableMap('period', 'T'), TableMap('depth', 'd'), TableMap('relH', 'H'), 
+                TableMap('m', 'm'), TableMap('cd', 'cd')]
+
+def _delay(meth_name, dpath):
+    jid = dpath.rsplit('_', 1)[1]
+    for item in filter(None, os.environ.get(DELAY_ENV, '').split(',')):
+        name, djid, secs = item.split(':')
+        if name == meth_name and djid == jid: time.sleep(float(secs))
+
+class FixtureJob(FunwaveJob):
+
+    def validate(self):
+        _delay('validate', self.dpath)
+        return super().validate()
+
+    def execute(self):
+        _delay('execute', self.dpath)
+
+        logger = self.logger
+        for i in range(EXEC_LOG_LINES): logger.info("Execute line %d" % i)
+
+        fpath = os.path.join(self.out_dpath, EXEC_FNAME)
+        with open(fpath, 'a') as f: f.write("executed\n")
+
+        self.add_param('new', 1.5)
+        self.add_file('executed', fpath)
+        return self.prep_return(Status.OK)
+
+if __name__ == '__main__':
+
+    if START_ENV in os.environ: multiprocessing.set_start_method(os.environ[START_ENV])
+
+    is_table = '--table' in sys.argv
+    if is_table: sys.argv.remove('--table')
+
+    btype = FixtureTableBatch if is_table else FixtureBatch
+    btype(FixtureJob).run()
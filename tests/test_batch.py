@@ -0,0 +1,104 @@
+import os
+import shutil
+import pytest
+import pandas.testing as pdt
+
+from conftest import run_batch, read_output, OUT_DNAME
+import fixture_batch
+from fixture_batch import EXEC_FNAME
+from directorybatching.core.job import Job
+
+LEAF_ID = 'batch_dir_leaf_id'
+
+def _n_executed(dpath):
+    fpath = os.path.join(dpath, 'postprocessing', EXEC_FNAME)
+    if not os.path.isfile(fpath): return 0
+    with open(fpath) as f: return len(f.readlines())
+
+def _results(df):
+    # Status text without Chained status ID, IDs depend on order statuses are registered
+    df = df.sort_values(LEAF_ID).reset_index(drop=True)
+    df['status'] = df['status'].str.split('] ', n=1).str[1]
+    return df[[LEAF_ID, 'status', 'new', 'job_files']]
+
+def test_resume_finished_batch(tree):
+
+    root, dpaths = tree
+
+    r = run_batch(root)
+    assert r.returncode == 0, r.stderr
+    df = _results(read_output(root))
+    assert df['job_files'].str.contains(EXEC_FNAME).sum() == 8
+
+    # Note: Remaining jobs all fail validation again 
+    r = run_batch(root)
+    assert r.returncode == 0, r.stderr
+
+    # Completed jobs are not rerun and keep their parameters and files
+    pdt.assert_frame_equal(_results(read_output(root)), df)
+    assert [_n_executed(d) for d in dpaths] == [1 if i % 2 == 1 else 0 for i in range(len(dpaths))]
+
+@pytest.mark.parametrize('is_all', [False, True])
+def test_resume_without_output(tmp_path, is_all):
+
+    root = str(tmp_path / 'root')
+    logs = (lambda jid: "Normal Termination!\n") if is_all else None
+    dpaths = fixture_batch.make_tree(root, logs=logs)
+
+    r = run_batch(root)
+    assert r.returncode == 0, r.stderr
+    df = _results(read_output(root))
+
+    # Note: Flag files are left behind without the results they refer to
+    shutil.rmtree(os.path.join(root, OUT_DNAME))
+    r = run_batch(root)
+    assert r.returncode == 0, r.stderr
+
+    # Stale flags are ignored, completed jobs are executed again 
+    pdt.assert_frame_equal(_results(read_output(root)), df)
+    assert [_n_executed(d) for d in dpaths] == [2 if is_all or i % 2 == 1 else 0 for i in range(len(dpaths))]
+
+    # All jobs completed, none left to validate
+    if is_all:
+        r = run_batch(root)
+        assert r.returncode == 0, r.stderr
+        pdt.assert_frame_equal(_results(read_output(root)), df)
+
+def _unknown_log(jid):
+    if jid % 4 == 0: return "x\n"
+    return "Normal Termination!\n" if jid % 2 == 0 else "PRINTING FILE NO. 99999\n"
+
+def test_unknown_not_executed(tmp_path):
+
+    # Note: No markers in LOG.txt or scheduler output of every 4th job, all checks fall through 
+    root = str(tmp_path / 'root')
+    dpaths = fixture_batch.make_tree(root, logs=_unknown_log)
+    jids = [int(d.rsplit('_', 1)[1]) for d in dpaths]
+    for d, jid in zip(dpaths, jids):
+        if jid % 4 != 0: continue
+        with open(os.path.join(d, 'slurm-%d.out' % jid), 'w') as f: f.write("x\n")
+
+    r = run_batch(root)
+    assert r.returncode == 0, r.stderr
+
+    df = _results(read_output(root))
+    assert (df['status'] == "UNKNOWN STATE").sum() == 4
+    assert [_n_executed(d) for d in dpaths] == [1 if j % 2 == 0 and j % 4 != 0 else 0 for j in jids]
+    assert [Job.is_complete(d) for d in dpaths] == [j % 2 == 0 and j % 4 != 0 for j in jids]
+
+def test_pipeline_final_statuses(tmp_path, monkeypatch):
+
+    root = str(tmp_path / 'root')
+    dpaths = fixture_batch.make_tree(root, logs=lambda jid: "Normal Termination!\n")
+
+    # Note: Execute block of fast jobs is synced while validation results of 
+    #       jobs 1013-1014 wait for slow jobs 1015-1016 to fill their block
+    delays = ['validate:1015:2', 'validate:1016:2', 'execute:1001:4']
+    monkeypatch.setenv(fixture_batch.DELAY_ENV, ','.join(delays))
+
+    r = run_batch(root, '-np', '4', '--pipeline', '--update-size', '3')
+    assert r.returncode == 0, r.stderr
+
+    df = _results(read_output(root))
+    assert (df['status'] == "ok").all(), df['status'].tolist()
+    assert [_n_executed(d) for d in dpaths] == [1]*len(dpaths)
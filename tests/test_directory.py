@@ -0,0 +1,123 @@
+import os
+import re
+import shutil
+import pytest
+from anytree import PreOrderIter
+
+import fixture_batch
+from conftest import run_batch, read_output, OUT_DNAME
+from fixture_batch import Status
+from directorybatching.core.directory import CompactTree, NodeView
+from directorybatching.core.job import Job
+from directorybatching.model.funwave import Status as FunwaveStatus
+
+def _logs(jid):
+    # Mix of missing, unstable and completed simulations
+    if jid % 5 == 0: return None
+    return "Normal Termination!\n" if jid % 2 == 0 else "PRINTING FILE NO. 99999\n"
+
+def _node_statuses(tree, nodes):
+    smaps = tree._smaps
+    rtnvals = []
+    for i, n in enumerate(nodes):
+        if isinstance(tree, CompactTree):
+            ids = tree._status_min_ids
+            smin = None if n.is_leaf else smaps.get_status(ids[i])
+        else:
+            smin = None if n.is_leaf else n._status_min
+        rtnvals.append((n.name, n.is_valid, n.status, smin))
+    return rtnvals
+
+def _tree_status(tree, name):
+    tree.print_tree_status(name)
+    fname = "filter_stage_%02d_%s.text" % (tree._n_updates, name)
+    with open(os.path.join(tree.dpaths.logs, fname)) as f: return f.read()
+
+@pytest.mark.parametrize('is_table', [False, True])
+def test_compact_tree_parity(tmp_path, new_batch, is_table):
+
+    root = str(tmp_path / 'root')
+    fixture_batch.make_tree(root, _logs)
+
+    args = ()
+    btype = fixture_batch.FixtureBatch
+    if is_table:
+        fpath = str(tmp_path / 'table.csv')
+        fixture_batch.make_table(fpath)
+        # Note: Directory without table row is marked as not matched
+        with open(fpath) as f: lines = f.readlines()
+        with open(fpath, 'w') as f: f.writelines(lines[:-1])
+        args, btype = ('-tp', fpath), fixture_batch.FixtureTableBatch
+
+    batch = new_batch(root, *args, btype=btype)
+    batch.run()
+
+    struc = batch._dstruc
+    compact = CompactTree(struc)
+    nodes = list(PreOrderIter(struc._root))
+    views = [NodeView(compact, i) for i in range(len(nodes))]
+    index = {id(n): i for i, n in enumerate(nodes)}
+
+    def check():
+        struc._update_status()
+        compact._update_status()
+        assert struc._is_valid == compact._is_valid
+        assert _node_statuses(struc, nodes) == _node_statuses(compact, views)
+        assert _tree_status(struc, 'struc') == _tree_status(compact, 'compact')
+
+    check()
+
+    # Incremental roll up of Structure against full roll up of CompactTree
+    for k, l in enumerate(struc.leafs[:5]):
+        status = Status.OK if k % 2 == 0 else FunwaveStatus.UNSTABLE
+        l.status = status
+        struc.mark_dirty(l)
+        views[index[id(l)]].status = status
+
+    check()
+
+def _crawl_counts(root):
+    # Reused and scanned directories of last crawl, see Structure.__init__
+    fpath = os.path.join(root, OUT_DNAME, 'logs', 'FunwaveBatch.log')
+    with open(fpath) as f: 
+        lines = [l for l in f.read().split('\n') if 'Crawl cache:' in l]
+    return tuple(int(v) for v in re.findall(r'(\d+) director\w+ reused, (\d+) scanned', lines[-1])[0])
+
+def test_crawl_cache_reused(tree):
+
+    root, dpaths = tree
+
+    # Note: All 17 non-leaf directories are scanned once
+    assert run_batch(root).returncode == 0
+    assert _crawl_counts(root) == (0, 17)
+
+    assert run_batch(root).returncode == 0
+    assert _crawl_counts(root) == (17, 0)
+
+    # Only parent of added job directory is rescanned 
+    dpath = os.path.join(os.path.dirname(dpaths[0]), 'cd030_1017')
+    shutil.copytree(dpaths[0], dpath, ignore=shutil.ignore_patterns(Job.OUT_DNAME))
+
+    r = run_batch(root)
+    assert r.returncode == 0, r.stderr
+    assert _crawl_counts(root) == (16, 1)
+    assert len(read_output(root)) == len(dpaths) + 1
+
+    assert run_batch(root, '--no-crawl-cache').returncode == 0
+    assert _crawl_counts(root) == (0, 17)
+
+def _crawl_tree(struc):
+    return [(n.name, getattr(n, 'dpath', None), getattr(n, 'leaf_id', None), getattr(n, 'rtnval', None)) 
+            for n in PreOrderIter(struc._root)]
+
+def test_crawl_concurrent(tmp_path, new_batch):
+
+    root = str(tmp_path / 'root')
+    fixture_batch.make_tree(root, _logs)
+
+    serial = new_batch(root, '--no-crawl-cache')
+    concurrent = new_batch(root, '--no-crawl-cache', '--crawl-workers', '4')
+
+    assert len(serial._dstruc.leafs) == 16
+    assert _crawl_tree(concurrent._dstruc) == _crawl_tree(serial._dstruc)
+    assert [l.leaf_id for l in concurrent._dstruc.leafs] == [l.leaf_id for l in serial._dstruc.leafs]
@@ -0,0 +1,69 @@
+import os
+import logging
+import threading
+import pytest
+
+from conftest import run_batch
+from fixture_batch import EXEC_LOG_LINES, START_ENV
+from directorybatching.core.job import Job
+from directorybatching.core.logger import RoutingHandler
+
+def _job_lines(dpath):
+    # Note: Log files are only created by the writer once a record is written
+    fpath = os.path.join(dpath, Job.OUT_DNAME, 'log.txt')
+    if not os.path.isfile(fpath): return []
+    with open(fpath) as f: 
+        return [l for l in f.read().split('\n') if 'Execute line' in l]
+
+# Note: Workers send records in batches, last partial batch is sent with the job result 
+@pytest.mark.parametrize('start_method', ['fork', 'spawn'])
+@pytest.mark.parametrize('executor', ['simple', 'stream', 'pool'])
+def test_job_logs_complete(tree, monkeypatch, start_method, executor):
+
+    root, dpaths = tree
+
+    monkeypatch.setenv(START_ENV, start_method)
+    r = run_batch(root, '-np', '2', '--executor', executor)
+    assert r.returncode == 0, r.stderr
+
+    # Executed jobs log all lines in order, others none
+    lines = ["Execute line %d" % k for k in range(EXEC_LOG_LINES)]
+    for i, d in enumerate(dpaths):
+        expected = lines if i % 2 == 1 else []
+        assert [l.split(') ', 1)[1] for l in _job_lines(d)] == expected
+
+def test_routing_evicts(tmp_path):
+
+    handler = RoutingHandler(max_open=2)
+    fpaths = [str(tmp_path / ('log_%d.txt' % i)) for i in range(5)]
+    for i, fpath in enumerate(fpaths): 
+        handler.register('job_%d' % i, fpath, logging.Formatter('%(message)s'))
+
+    # Note: Files are reopened in append mode after being evicted
+    for k in range(3):
+        for i in range(5):
+            handler.emit(logging.makeLogRecord({'name': 'job_%d' % i, 'msg': 'line %d' % k}))
+            assert len(handler._streams) <= 2
+
+    # Records of unregistered loggers are dropped
+    handler.emit(logging.makeLogRecord({'name': 'other', 'msg': 'x'}))
+    handler.close()
+
+    for fpath in fpaths:
+        with open(fpath) as f: assert f.read() == "line 0\nline 1\nline 2\n"
+
+def test_run_closes_logs(tree, new_batch):
+
+    root, _ = tree
+
+    def threads():
+        # Note: Progress bar monitor thread is kept by tqdm
+        return [t for t in threading.enumerate() if not t.name == 'tqdm_monitor']
+
+    threads_prev = threads()
+    batch = new_batch(root, '-np', '2')
+    batch.run()
+
+    # Listener and queue threads of shared log writer are stopped
+    assert batch._mlogs._writer is None
+    assert threads() == threads_prev
@@ -0,0 +1,161 @@
+import time
+import threading
+import functools
+import pytest
+import multiprocessing
+import pandas.testing as pdt
+from multiprocessing import Pool
+
+from conftest import run_batch, read_output
+from test_batch import _results
+from directorybatching.core import parallel
+
+N = 24
+
+def _square(i):
+    time.sleep(0.005)
+    return i*i
+
+def _counted(items, counts):
+    # Counts items read by the pool's task feeder
+    for item in items:
+        counts['read'] += 1
+        yield item
+
+def _collect(results, counts):
+    # Checks number of read but uncollected items as each result is received 
+    indices = []
+    for i, r in results:
+        assert r == i*i
+        indices.append(i)
+        counts['max'] = max(counts['max'], counts['read'] - len(indices))
+    return indices
+
+@pytest.mark.parametrize('n_procs', [1, 3])
+@pytest.mark.parametrize('chunksize', [1, 4])
+@pytest.mark.parametrize('max_inflight', [None, 2, 5])
+def test_stream_indices(n_procs, chunksize, max_inflight):
+
+    funcs = [functools.partial(_square, i) for i in range(N)]
+    results = parallel.stream(funcs, n_procs, is_p_bar=False, chunksize=chunksize, max_inflight=max_inflight)
+
+    indices = [i for i, r in results if r == i*i]
+    assert sorted(indices) == list(range(N))
+
+@pytest.mark.parametrize('chunksize, max_inflight', [(1, 2), (1, 5), (4, 2), (4, 8)])
+def test_imap_max_inflight(chunksize, max_inflight):
+
+    counts = {'read': 0, 'max': 0}
+    items = _counted(enumerate(functools.partial(_square, i) for i in range(N)), counts)
+
+    with Pool(3) as pool:
+        indices = _collect(parallel._imap(pool, parallel._call, items, chunksize, max_inflight), counts)
+
+    assert sorted(indices) == list(range(N))
+    # Note: Window is widened to fit at least one chunk, see _imap
+    assert counts['max'] <= max(max_inflight, chunksize)
+
+def test_imap_unbounded():
+
+    # Note: Without a window the pool reads ahead, i.e., bound above is not trivial
+    counts = {'read': 0, 'max': 0}
+    items = _counted(enumerate(functools.partial(_square, i) for i in range(N)), counts)
+
+    with Pool(3) as pool:
+        indices = _collect(parallel._imap(pool, parallel._call, items), counts)
+
+    assert sorted(indices) == list(range(N))
+    assert counts['max'] > 5
+
+def _close_early(results, n):
+    for k, _ in enumerate(results):
+        if k + 1 == n: break
+    results.close()
+
+def _run_with_timeout(func, *args, timeout=30):
+    thread = threading.Thread(target=func, args=args, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    return not thread.is_alive()
+
+@pytest.mark.parametrize('max_inflight', [None, 2])
+def test_stream_close_early(max_inflight):
+
+    funcs = [functools.partial(_square, i) for i in range(N)]
+    results = parallel.stream(funcs, 3, is_p_bar=False, max_inflight=max_inflight)
+    assert _run_with_timeout(_close_early, results, 3)
+
+    # Pool is shut down with the generator
+    assert len(multiprocessing.active_children()) == 0
+
+@pytest.mark.parametrize('args', [('--executor', 'stream'), 
+                                  ('--executor', 'stream', '--chunksize', '3', '--max-inflight', '2')])
+def test_stream_batch(tree, args):
+
+    root, dpaths = tree
+
+    r = run_batch(root, '-np', '3')
+    assert r.returncode == 0, r.stderr
+    df = _results(read_output(root))
+
+    # Note: Completed jobs are re-run in refresh mode
+    r = run_batch(root, '-np', '3', '--refresh', *args)
+    assert r.returncode == 0, r.stderr
+    pdt.assert_frame_equal(_results(read_output(root)), df)
+
+class _Resident:
+
+    def __init__(self, i):
+        self._i = i
+        self._params = {}
+
+    def square(self):
+        time.sleep(0.005)
+        return self._i*self._i
+
+    def param(self): return self._params.get('p')
+
+def _tasks(meth_name, updates=None):
+    return [(i, meth_name, updates) for i in range(N)]
+
+@pytest.mark.parametrize('n_procs', [1, 3])
+@pytest.mark.parametrize('chunksize, max_inflight', [(1, None), (1, 2), (4, 3)])
+def test_executor_resident(n_procs, chunksize, max_inflight):
+
+    objs = {i: _Resident(i) for i in range(N)}
+    with parallel.Executor(objs, n_procs, chunksize, max_inflight) as executor:
+
+        # Note: Same workers and objects are used for every stream
+        indices = [i for i, r in executor.stream(_tasks('square'), is_p_bar=False) if r == i*i]
+        assert sorted(indices) == list(range(N))
+
+        results = dict(executor.stream(_tasks('param', {'_params': {'p': 7}}), is_p_bar=False))
+        assert results == {i: 7 for i in range(N)}
+
+@pytest.mark.parametrize('max_inflight', [None, 2])
+def test_executor_close_early(max_inflight):
+
+    objs = {i: _Resident(i) for i in range(N)}
+    executor = parallel.Executor(objs, 3, max_inflight=max_inflight)
+
+    results = executor.stream(_tasks('square'), is_p_bar=False)
+    assert _run_with_timeout(_close_early, results, 3)
+
+    # Note: Workers exit normally, i.e., task feeder must not be left waiting 
+    assert _run_with_timeout(executor.close)
+    assert len(multiprocessing.active_children()) == 0
+
+@pytest.mark.parametrize('args', [('--executor', 'pool'), 
+                                  ('--executor', 'pool', '--chunksize', '3', '--max-inflight', '2'),
+                                  ('--pipeline', '--max-inflight', '2')])
+def test_pool_batch(tree, args):
+
+    root, dpaths = tree
+
+    r = run_batch(root, '-np', '3')
+    assert r.returncode == 0, r.stderr
+    df = _results(read_output(root))
+
+    r = run_batch(root, '-np', '3', '--refresh', *args)
+    assert r.returncode == 0, r.stderr
+    pdt.assert_frame_equal(_results(read_output(root)), df)
@@ -0,0 +1,53 @@
+import os
+import pytest
+
+import directorybatching.core.parser as parser
+from directorybatching.core.parser import parser_config
+from directorybatching.core.directory import Map, CrawlCache
+
+def _maps(digits=2, delimiter='_'):
+    v = parser.StartsWith()
+    pre = parser.Preprocessor.JobID(delimiter)
+    return [Map('m', 'm', parser.Integer(v)), Map('cd', 'cd', parser.Decimal(v, digits, preprocessor=pre))]
+
+def test_parser_config_same_settings():
+    v = parser.StartsWith()
+    assert parser_config(parser.Decimal(v, 2)) == parser_config(parser.Decimal(parser.StartsWith(), 2))
+
+    # Note: Regexes compiled when parsing are not settings 
+    p = parser.Integer(v)
+    key = parser_config(p)
+    p.forward_many('m', ['m1', 'm2'])
+    assert parser_config(p) == key
+
+@pytest.mark.parametrize('other', [lambda v: parser.Decimal(v, 3),
+                                   lambda v: parser.Decimal(v, 2, offset=1),
+                                   lambda v: parser.Decimal(v, 2, is_flip_sign=True),
+                                   lambda v: parser.Decimal(v, 2, preprocessor=parser.Preprocessor.JobID('-')),
+                                   lambda v: parser.Integer(v)])
+def test_parser_config_changed_settings(other):
+    v = parser.StartsWith()
+    assert not parser_config(parser.Decimal(v, 2)) == parser_config(other(v))
+
+def test_crawl_cache_invalidated(tmp_path):
+
+    dpath = tmp_path / 'root'
+    for name in ('cd010_1', 'cd020_2'): os.makedirs(dpath / name)
+    fpath = str(tmp_path / 'crawl_cache.pkl')
+
+    def scan(maps):
+        cache = CrawlCache(fpath, maps)
+        p = maps[1].parser
+        rtnvals = cache.scan(str(dpath), lambda names: p.forward_many('cd', names))
+        cache.save()
+        return cache, dict(rtnvals)
+
+    cache, rtnvals = scan(_maps())
+    assert cache.n_misses == 1 and rtnvals['cd010_1']['cd'] == 0.1
+
+    cache, rtnvals = scan(_maps())
+    assert cache.n_hits == 1
+
+    # Changed precision is reparsed instead of reusing stale values 
+    cache, rtnvals = scan(_maps(digits=1))
+    assert cache.n_misses == 1 and rtnvals['cd010_1']['cd'] == 1.0
@@ -0,0 +1,46 @@
+import os
+
+from conftest import run_batch, read_output
+import fixture_batch
+from directorybatching.core import scheduler
+from directorybatching.core.scheduler import QueueSnapshot, FakeQueueProvider
+
+def test_queue_snapshot_len():
+
+    items = [(1, scheduler.QUEUED, '/a'), (2, scheduler.RUNNING, None),
+             (None, scheduler.QUEUED, '/b'), (None, scheduler.QUEUED, '/b/')]
+    queue = QueueSnapshot(items)
+
+    assert len(queue) == 3
+    assert queue.get('/b') == scheduler.QUEUED
+    assert queue.get('/c', 2) == scheduler.RUNNING
+
+    # Note: Fake provider only sets one of job id or directory per job
+    queue = FakeQueueProvider({'/a': scheduler.QUEUED, 3: scheduler.RUNNING}).snapshot()
+    assert len(queue) == 2
+
+def test_queue_snapshot_relative(tmp_path, monkeypatch):
+
+    dpath = tmp_path / 'root' / 'cd010_1'
+    os.makedirs(dpath)
+    monkeypatch.chdir(tmp_path)
+
+    queue = QueueSnapshot([(None, scheduler.QUEUED, str(dpath))])
+    assert queue.get(os.path.join('root', 'cd010_1')) == scheduler.QUEUED
+    assert queue.get(os.path.join('.', 'root', '..', 'root', 'cd010_1/')) == scheduler.QUEUED
+
+def test_queue_relative_root(tmp_path, monkeypatch):
+
+    root = tmp_path / 'root'
+    dpaths = fixture_batch.make_tree(str(root))
+
+    # Note: Job ID does not match directory suffix, only found by working directory
+    fpath = tmp_path / 'squeue.txt'
+    fpath.write_text("99 PENDING %s\n" % os.path.realpath(dpaths[1]))
+
+    monkeypatch.chdir(tmp_path)
+    r = run_batch('root', '--queue-file', str(fpath))
+    assert r.returncode == 0, r.stderr
+
+    statuses = read_output(str(root))['status'].str.split('] ', n=1).str[1].tolist()
+    assert statuses.count("In PBS queue") == 1
@@ -0,0 +1,19 @@
+import os
+import pytest
+
+from directorybatching.core.state import TreeState, node_row
+
+@pytest.mark.parametrize('dname', ['plain', 'a?b', 'a#b', 'a%20b'])
+def test_load_special_path(tmp_path, dname):
+
+    dpath = tmp_path / dname
+    os.makedirs(dpath)
+    fpath = str(dpath / 'state.sqlite')
+
+    rows = [node_row(0, None, 'root', 'root', str(dpath), None, False, False, None, None, True),
+            node_row(1, 0, 'cd010', 'cd010', str(dpath / 'cd010'), 7, True, False, {'cd': 0.01}, None, False)]
+    assert TreeState(fpath).save(rows) == 2
+
+    state = TreeState.load(fpath)
+    assert [l.leaf_id for l in state.leafs] == [7]
+    assert state.leafs[0].rtnval == {'cd': 0.01}
@@ -0,0 +1,79 @@
+import os
+import pytest
+from types import SimpleNamespace
+
+from directorybatching.core.table import Table, LEAF_ID_COLUMN, FILES_COLUMN
+from directorybatching.core.directory import LEAF_ID_BITS
+from fixture_batch import Status
+
+def _relabel(tbl, new_ids):
+    # Replaces leaf IDs of table rows and their node map
+    old_ids = tbl._df[LEAF_ID_COLUMN].tolist()
+    tbl._df[LEAF_ID_COLUMN] = [new_ids[i] for i in old_ids]
+    tbl._df_idmap = {new_ids[i]: tbl._df_idmap[i] for i in old_ids}
+
+@pytest.mark.parametrize('is_large', [False, True])
+@pytest.mark.parametrize('n', [1, 2, 16])
+def test_update_from_jobs(tree, new_batch, n, is_large):
+
+    root, _ = tree
+    tbl = new_batch(root)._table
+
+    # Note: IDs near int64 maximum overflowed range inference of pandas, 
+    #       e.g., two IDs whose difference added to the larger one overflows
+    if is_large:
+        old_ids = tbl._df[LEAF_ID_COLUMN].tolist()
+        _relabel(tbl, {i: 2**62 if k == 0 else 2**63 - 1 - k for k, i in enumerate(old_ids)})
+
+    list_args = tbl.prep_list_job_args()[:n]
+    jobs = [SimpleNamespace(_leaf_id=leaf_id, _files={'out': dpath}) for leaf_id, dpath, _ in list_args]
+    results = [SimpleNamespace(status=Status.OK, job_params={'val': i + 0.5}, job_files={}, is_continue=False) 
+               for i in range(n)]
+
+    tbl.update_from_jobs(jobs, results)
+
+    df = tbl._df
+    rows = {int(r[LEAF_ID_COLUMN]): r for r in df.to_dict('records')}
+    assert len(rows) == len(df)
+
+    for i, (leaf_id, dpath, _) in enumerate(list_args):
+        row = rows[int(leaf_id)]
+        assert row['val'] == i + 0.5
+        assert row[FILES_COLUMN] == {'out': dpath}
+        assert tbl._df_idmap[leaf_id].status == Status.OK
+
+    updated = set(int(a[0]) for a in list_args)
+    others = [r for k, r in rows.items() if not k in updated]
+    assert all(r['val'] != r['val'] for r in others)
+
+def test_leaf_ids_fit_width(tree, new_batch):
+    root, _ = tree
+    ids = new_batch(root)._table._df[LEAF_ID_COLUMN].tolist()
+    assert len(set(ids)) == len(ids) == 16
+    assert all(0 <= i < 2**LEAF_ID_BITS for i in ids)
+
+def test_journal_round_trip(tree, new_batch, tmp_path):
+
+    root, _ = tree
+    tbl = new_batch(root)._table
+    tbl.write_data()
+
+    # Note: Values needing all 17 significant digits to round trip 
+    list_args = tbl.prep_list_job_args()[:3]
+    jobs = [SimpleNamespace(_leaf_id=leaf_id, _files={'out': dpath}) for leaf_id, dpath, _ in list_args]
+    results = [SimpleNamespace(status=Status.OK, job_params={'val': (i + 1)/3, 'big': 0.1 + 0.2 + i*1e-12}, 
+                               job_files={}, is_continue=False) for i in range(3)]
+
+    # Changed rows are appended to journal, see Table.sync_data
+    tbl.update_from_jobs(jobs, results)
+    assert os.path.isfile(tbl._journal_fpath)
+
+    Table.materialize(tbl._data_dpath, tbl._journal_fpath)
+    assert not os.path.isfile(tbl._journal_fpath)
+
+    fpath = str(tmp_path / 'direct.csv')
+    Table.write_df(tbl._df, fpath, tbl._smaps)
+
+    with open(fpath) as f: direct = f.read()
+    with open(tbl._data_dpath) as f: materialized = f.read()
+    assert materialized == direct